@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 
 import os
+import sys
 import json
 
 try:
@@ -13,6 +14,7 @@ import argparse
 from manager import filesystem
 from manager import config
 from manager import template as template
+from manager import artifact
 from ade.manager.exceptions import ConfigError
 
 
@@ -21,7 +23,7 @@ def arguments():
     """
     parser = argparse.ArgumentParser(prog='ade')
     parser.add_argument(
-        'action', choices=['create', 'parse'],
+        'action', choices=['create', 'parse', 'export'],
         help='Application action'
     )
 
@@ -60,6 +62,46 @@ def arguments():
         help='Path to be parsed or created to'
     )
 
+    parser.add_argument(
+        '--paths',
+        help=(
+            'File of newline separated paths to parse, - for stdin,'
+            ' results are written as JSON lines (parse action only)'
+        )
+    )
+
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help=(
+            'Create, write or set the permission of the missing or'
+            ' different paths only (create action only)'
+        )
+    )
+
+    parser.add_argument(
+        '--dry_run',
+        action='store_true',
+        help=(
+            'Print the operations of the build as json, without'
+            ' creating anything (create action only)'
+        )
+    )
+
+    parser.add_argument(
+        '--detect',
+        action='store_true',
+        help=(
+            'Parse against all the registered templates, the root template'
+            ' first, and report the matched one (parse action only)'
+        )
+    )
+
+    parser.add_argument(
+        '--artifact',
+        help='Compiled template artifact to write (export action only)'
+    )
+
     parser.add_argument(
         '--data',
         nargs='*',
@@ -112,9 +154,18 @@ def run():
 
     root_template = config_mode['root_template']
 
-    # Create a new manager
+    # Create a new manager, registering only the templates in use,
+    # unless all of them get exported or detected
 
-    template_manager = template.TemplateManager(config_mode)
+    detect = args.get('detect')
+    export = args.get('action') == 'export'
+    if export:
+        # Export from the templates, never from a previous artifact
+        config_mode = dict(config_mode, template_artifact_path=None)
+
+    template_manager = template.TemplateManager(
+        config_mode, lazy=not export and not detect
+    )
     manager = filesystem.FileSystemManager(
         config_mode,
         template_manager
@@ -122,9 +173,67 @@ def run():
 
     input_template = args.get('template')
 
+    detect_names = None
+    if detect and template_manager.has_template(root_template):
+        detect_names = [root_template] + [
+            registered for registered in template_manager.template_names
+            if registered != root_template
+        ]
+
+    def parse_many(paths):
+        if not detect:
+            for path, results in manager.parse_many(paths, root_template):
+                yield dict(path=path, data=results[0] if results else None)
+
+            return
+
+        for path in paths:
+            result = manager.detect(path, detect_names) or dict(data=None)
+            result['path'] = path
+            yield result
+
     if args.get('action') == 'create':
         # current_data = manager.parse(path, root_template)
-        manager.build(input_template, input_data, path)
+        if args.get('dry_run'):
+            plan = manager.build_plan(
+                input_template, input_data, path,
+                incremental=args.get('incremental')
+            )
+            if plan:
+                print json.dumps(plan)
+        elif args.get('incremental'):
+            manager.build_incremental(input_template, input_data, path)
+        else:
+            manager.build(input_template, input_data, path)
+
+    if export:
+        artifact_path = args.get('artifact')
+        if not artifact_path:
+            logger.warning('Please provide the --artifact file to write.')
+            return
+
+        compiled = artifact.TemplateArtifact.from_managers(
+            template_manager, manager
+        )
+        compiled.save(artifact_path)
+        logger.info('Exported {0} templates to {1}'.format(
+            len(compiled.compiled), artifact_path)
+        )
+
+    if args.get('action') == 'parse' and args.get('paths'):
+        paths_file = args.get('paths')
+        paths_data = sys.stdin if paths_file == '-' else open(paths_file)
+        try:
+            paths = (line.strip() for line in paths_data)
+            paths = (os.path.abspath(line) for line in paths if line)
+            for result in parse_many(paths):
+                sys.stdout.write(json.dumps(result) + '\n')
+                sys.stdout.flush()
+        finally:
+            if paths_data is not sys.stdin:
+                paths_data.close()
+
+        return
 
     if args.get('action') == 'parse':
         path = os.path.realpath(path)
@@ -133,6 +242,15 @@ def run():
             logger.warning('{0} does not exist.'.format(path))
             return
 
+        if detect:
+            result = manager.detect(path, detect_names)
+            if result:
+                print json.dumps(result)
+            else:
+                logger.info('No template found to parse {0}'.format(path))
+
+            return
+
         results = manager.parse(path, root_template)
         if results:
             print json.dumps(results[0])
@@ -0,0 +1,227 @@
+'''
+Template artifact
+
+Provide a single, versioned, file holding a compiled template set:
+the register, the resolved templates, their parsers and the contents
+of the template files. Loading an artifact neither walks the template
+folders nor builds any regular expression.
+
+'''
+import os
+import tempfile
+from cStringIO import StringIO
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+try:
+    import efesto_logger as logging
+except:
+    import logging
+
+from ade.manager.content import TemplateContent, StoredContent, content_store
+from ade.manager.exceptions import TemplateError, ConfigError
+
+logger = logging.getLogger(__name__)
+
+#: Version of the artifact layout, bump it on any change.
+ARTIFACT_VERSION = 2
+
+
+class TemplateArtifact(object):
+    ''' A compiled template set.
+
+    :param templates: The registered templates.
+    :type templates: list
+    :param compiled: The resolved templates, by name.
+    :type compiled: dict
+    :param parsers: The path components of the parsers of the resolved
+                    templates, by name.
+    :type parsers: dict
+    :param regexp_mapping: The regexp_mapping the parsers were built with.
+    :type regexp_mapping: dict
+
+    '''
+    def __init__(
+        self, templates, compiled, parsers=None, regexp_mapping=None
+    ):
+        self.templates = templates
+        self.compiled = compiled
+        self.parsers = parsers or {}
+        self.regexp_mapping = regexp_mapping
+        self._content_keys = []
+
+    @classmethod
+    def from_managers(
+        cls, template_manager, filesystem_manager=None, names=None
+    ):
+        ''' Return the artifact of the templates of *template_manager*.
+
+        :param template_manager: The manager holding the templates.
+        :type template_manager: TemplateManager
+        :param filesystem_manager: The manager building the parsers,
+                                   no parser is stored if not given.
+        :type filesystem_manager: FileSystemManager
+        :param names: The templates to compile, defaults to all the
+                      registered ones, skipping those which do not compile.
+        :type names: list
+        :returns:  TemplateArtifact -- the artifact.
+        :raises: KeyError, TemplateError, ConfigError
+
+        .. code-block:: python
+
+            from ade.manager.artifact import TemplateArtifact
+
+            artifact = TemplateArtifact.from_managers(
+                template_manager, filesystem_manager
+            )
+            artifact.save('templates.ade')
+
+        '''
+        strict = names is not None
+        if names is None:
+            names = template_manager.template_names
+
+        compiled = {}
+        parsers = {}
+        for name in names:
+            try:
+                template = template_manager.compile_template(name).template
+                if filesystem_manager is not None:
+                    parsers[name] = filesystem_manager._to_components(
+                        template_manager.iter_resolve(template)
+                    )
+            except (KeyError, TemplateError, ConfigError) as error:
+                if strict:
+                    raise
+
+                logger.warning('Skipping template {0}: {1}'.format(
+                    name, error)
+                )
+                parsers.pop(name, None)
+                continue
+
+            compiled[name] = template
+
+        regexp_mapping = None
+        if filesystem_manager is not None:
+            regexp_mapping = dict(filesystem_manager.regexp_mapping)
+
+        return cls(
+            list(template_manager._iter_register()), compiled, parsers,
+            regexp_mapping
+        )
+
+    def save(self, artifact_path):
+        ''' Write the artifact to the file *artifact_path*.
+
+        Contents of the template files are stored along, once per
+        unique content.
+
+        :param artifact_path: The artifact file.
+        :type artifact_path: str
+        :raises: IOError, OSError
+
+        '''
+        contents = {}
+
+        def persistent_id(obj):
+            if isinstance(obj, TemplateContent):
+                key = obj.key
+                contents.setdefault(key, obj.read())
+                return ('content', obj.path, key)
+
+            return None
+
+        payload = StringIO()
+        pickler = pickle.Pickler(payload, pickle.HIGHEST_PROTOCOL)
+        pickler.persistent_id = persistent_id
+        pickler.dump(dict(
+            templates=self.templates,
+            compiled=self.compiled,
+            parsers=self.parsers,
+            regexp_mapping=self.regexp_mapping
+        ))
+
+        artifact = dict(
+            version=ARTIFACT_VERSION,
+            contents=contents,
+            payload=payload.getvalue()
+        )
+
+        # Write aside and rename, so readers never get a partial file
+        artifact_path = os.path.realpath(artifact_path)
+        handle, temp_file = tempfile.mkstemp(
+            dir=os.path.dirname(artifact_path)
+        )
+        with os.fdopen(handle, 'wb') as artifact_data:
+            pickle.dump(artifact, artifact_data, pickle.HIGHEST_PROTOCOL)
+
+        # Artifacts are shared, give them the default file mode
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(temp_file, 0o666 & ~umask)
+        os.rename(temp_file, artifact_path)
+        logger.debug('Saved artifact {0}'.format(artifact_path))
+
+    @classmethod
+    def load(cls, artifact_path):
+        ''' Return the artifact stored in the file *artifact_path*.
+
+        :param artifact_path: The artifact file.
+        :type artifact_path: str
+        :returns:  TemplateArtifact -- the artifact.
+        :raises: IOError, TemplateError
+
+        '''
+        with open(artifact_path, 'rb') as artifact_data:
+            try:
+                artifact = pickle.load(artifact_data)
+            except Exception as error:
+                raise TemplateError(
+                    'Could not load artifact {0}: {1}'.format(
+                        artifact_path, error
+                    )
+                )
+
+        version = None
+        if isinstance(artifact, dict):
+            version = artifact.get('version')
+
+        if version != ARTIFACT_VERSION:
+            raise TemplateError(
+                'Artifact {0} version {1} is not supported, expected {2}'.format(
+                    artifact_path, version, ARTIFACT_VERSION
+                )
+            )
+
+        content_keys = [
+            content_store.add(data) for data in artifact['contents'].values()
+        ]
+
+        def persistent_load(persistent):
+            kind, path, key = persistent
+            return StoredContent(path, key)
+
+        unpickler = pickle.Unpickler(StringIO(artifact['payload']))
+        unpickler.persistent_load = persistent_load
+        payload = unpickler.load()
+
+        logger.debug('Loaded artifact {0}'.format(artifact_path))
+        loaded = cls(**payload)
+        loaded._content_keys = content_keys
+        return loaded
+
+    def release(self):
+        ''' Release the contents the artifact added to the shared
+        :data:`~ade.manager.content.content_store` when loaded.
+
+        Its templates can not be built any more afterwards, the
+        :class:`~ade.manager.template.TemplateManager` releases the
+        artifact once it gets replaced.
+
+        '''
+        content_store.release(self._content_keys)
+        self._content_keys = []
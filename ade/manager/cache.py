@@ -0,0 +1,171 @@
+'''
+Register cache
+
+Provide an on disk cache of the scanned template register,
+revalidated against the stats of the template folders.
+
+'''
+import os
+import hashlib
+import tempfile
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+try:
+    import efesto_logger as logging
+except:
+    import logging
+
+logger = logging.getLogger(__name__)
+
+#: Version of the cache files layout, bump it on any change.
+CACHE_VERSION = 2
+
+
+def directory_stamp(stats):
+    ''' Return the stamp identifying the state of a directory.
+
+    :param stats: The result of :func:`os.stat` on the directory.
+    :type stats: posix.stat_result
+    :returns:  tuple -- the directory stamp.
+
+    '''
+    return (stats.st_mtime, stats.st_ctime, stats.st_ino, stats.st_dev)
+
+
+def changed_directories(stamps):
+    ''' Return the directories which changed since *stamps* were taken.
+
+    :param stamps: The directory stamps, by directory path.
+    :type stamps: dict
+    :returns:  list -- the changed or removed directory paths.
+
+    '''
+    changed = []
+    for path, stamp in stamps.items():
+        try:
+            current = directory_stamp(os.stat(path))
+        except OSError:
+            current = None
+
+        if current != stamp:
+            changed.append(path)
+
+    return changed
+
+
+class RegisterCache(object):
+    ''' On disk cache of the templates registered from a template folder.
+
+    The cache stores, along with the templates, the stamp of each
+    scanned directory. It is valid as long as none of the directories
+    changed, so adding, removing or renaming an entry invalidates it.
+
+    .. note::
+        Changing the permission of a file does not touch its directory,
+        use :meth:`clear` to force a new scan in such case.
+
+    :param cache_folder: The folder where the cache files are stored.
+    :type cache_folder: str
+
+    '''
+    def __init__(self, cache_folder):
+        self.cache_folder = os.path.realpath(cache_folder)
+
+    def _cache_file(self, template_folder):
+        ''' Return the cache file path of the given *template_folder*.
+        '''
+        key = hashlib.sha1(template_folder).hexdigest()
+        return os.path.join(
+            self.cache_folder, 'register-{0}.cache'.format(key)
+        )
+
+    def load(self, template_folder):
+        ''' Return the cached templates of *template_folder* if still valid.
+
+        :param template_folder: The template path.
+        :type template_folder: str
+        :returns:  tuple -- the templates and directory stamps, or None.
+
+        '''
+        cache_file = self._cache_file(template_folder)
+        if not os.path.exists(cache_file):
+            return None
+
+        try:
+            with open(cache_file, 'rb') as cache_data:
+                cached = pickle.load(cache_data)
+        except Exception as error:
+            logger.warning('Could not load cache {0}: {1}'.format(
+                cache_file, error)
+            )
+            return None
+
+        if (
+            cached.get('version') != CACHE_VERSION or
+            cached.get('template_folder') != template_folder
+        ):
+            logger.debug('Discarding outdated cache {0}'.format(cache_file))
+            return None
+
+        stamps = cached['stamps']
+        changed = changed_directories(stamps)
+        if changed:
+            logger.debug('Discarding cache {0}, changed: {1}'.format(
+                cache_file, changed)
+            )
+            return None
+
+        logger.debug('Using cache {0}'.format(cache_file))
+        return cached['templates'], stamps
+
+    def save(self, template_folder, templates, stamps):
+        ''' Store the given *templates* of *template_folder*.
+
+        :param template_folder: The template path.
+        :type template_folder: str
+        :param templates: The templates registered from the folder.
+        :type templates: list
+        :param stamps: The stamps of the scanned directories.
+        :type stamps: dict
+
+        '''
+        cache_file = self._cache_file(template_folder)
+        cached = dict(
+            version=CACHE_VERSION,
+            template_folder=template_folder,
+            templates=templates,
+            stamps=stamps
+        )
+
+        try:
+            if not os.path.exists(self.cache_folder):
+                os.makedirs(self.cache_folder)
+
+            # Write aside and rename, so readers never get a partial file
+            handle, temp_file = tempfile.mkstemp(dir=self.cache_folder)
+            with os.fdopen(handle, 'wb') as cache_data:
+                pickle.dump(cached, cache_data, pickle.HIGHEST_PROTOCOL)
+
+            os.rename(temp_file, cache_file)
+        except (IOError, OSError) as error:
+            logger.warning('Could not save cache {0}: {1}'.format(
+                cache_file, error)
+            )
+            return
+
+        logger.debug('Saved cache {0}'.format(cache_file))
+
+    def clear(self, template_folder):
+        ''' Remove the cache of the given *template_folder*.
+
+        :param template_folder: The template path.
+        :type template_folder: str
+
+        '''
+        cache_file = self._cache_file(template_folder)
+        if os.path.exists(cache_file):
+            os.remove(cache_file)
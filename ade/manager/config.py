@@ -54,11 +54,21 @@ class ConfigManager(object):
                 self._resolve_envs(v)
 
             if isinstance(v, basestring):
-                path = os.path.expandvars(v)
-                if os.path.exists(path):
-                    path = os.path.realpath(path)
+                config[k] = self._resolve_env(v)
 
-                config[k] = path
+            if isinstance(v, list):
+                config[k] = [
+                    self._resolve_env(item)
+                    if isinstance(item, basestring) else item
+                    for item in v
+                ]
+
+    def _resolve_env(self, value):
+        path = os.path.expandvars(value)
+        if os.path.exists(path):
+            path = os.path.realpath(path)
+
+        return path
 
     @property
     def modes(self):
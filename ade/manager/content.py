@@ -0,0 +1,266 @@
+'''
+Template content
+
+Provide lazy accessors to the content of the template files,
+so that the files are read only when a structure gets built, and a
+shared store holding each unique content only once.
+
+'''
+import os
+import hashlib
+import threading
+
+try:
+    import efesto_logger as logging
+except:
+    import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ContentStore(object):
+    ''' Store of the template contents, by digest.
+
+    Files with the same content, eg: empty .gitignore, share the same
+    stored string. Files are read again only when their stat changes.
+    Contents are counted by the files and the loaded artifacts using
+    them, and dropped once none uses them any more: once the files are
+    forgotten and the artifacts released.
+
+    '''
+    def __init__(self):
+        self._contents = {}
+        self._keys = {}
+        self._references = {}
+        self._lock = threading.Lock()
+
+    def key(self, path):
+        ''' Return the key of the content of the file *path*.
+
+        :param path: The path of the file.
+        :type path: str
+        :returns:  str -- the digest of the file content.
+        :raises: IOError, OSError
+
+        '''
+        try:
+            stats = os.stat(path)
+        except OSError:
+            self.forget(path)
+            raise
+
+        stamp = (stats.st_size, stats.st_mtime, stats.st_ino)
+        cached = self._keys.get(path)
+        if cached and cached[0] == stamp:
+            return cached[1]
+
+        logger.debug('reading content of: {0}'.format(path))
+        with open(path, 'r') as file_data:
+            data = file_data.read()
+
+        with self._lock:
+            key = self._store(data)
+            cached = self._keys.get(path)
+            self._keys[path] = (stamp, key)
+            if cached:
+                self._release(cached[1])
+
+        return key
+
+    def add(self, data):
+        ''' Store the given content *data*, eg: loaded from an artifact.
+
+        :param data: The content.
+        :type data: str
+        :returns:  str -- the digest of the content.
+
+        '''
+        with self._lock:
+            return self._store(data)
+
+    def release(self, keys):
+        ''' Drop a reference of each of the content *keys* returned by
+        :meth:`add`, eg: once the artifact they were loaded from is
+        replaced, along with the contents nothing else uses.
+
+        :param keys: The content digests.
+        :type keys: list
+
+        '''
+        with self._lock:
+            for key in keys:
+                # Contents dropped by clear are not referenced any more
+                if key in self._references:
+                    self._release(key)
+
+    def forget(self, path):
+        ''' Drop the keys of the file *path*, and of the files below it,
+        eg: once removed, along with the contents no other file uses.
+
+        :param path: The path of a file or folder.
+        :type path: str
+
+        '''
+        prefix = path + os.sep
+        with self._lock:
+            for known in list(self._keys):
+                if known == path or known.startswith(prefix):
+                    self._release(self._keys.pop(known)[1])
+
+    def _store(self, data):
+        ''' Store and reference the content *data*, return its key.
+        '''
+        key = hashlib.sha1(data).hexdigest()
+        self._contents.setdefault(key, data)
+        self._references[key] = self._references.get(key, 0) + 1
+        return key
+
+    def _release(self, key):
+        ''' Drop a reference of the content *key*, and the content
+        itself once unreferenced.
+        '''
+        count = self._references[key] - 1
+        if count:
+            self._references[key] = count
+        else:
+            del self._references[key]
+            del self._contents[key]
+
+    def get(self, key):
+        ''' Return the content stored with the given *key*.
+
+        :param key: The content digest.
+        :type key: str
+        :returns:  str -- the content.
+        :raises: KeyError
+
+        '''
+        return self._contents[key]
+
+    def read(self, path):
+        ''' Return the content of the file *path*.
+
+        :param path: The path of the file.
+        :type path: str
+        :returns:  str -- the file content.
+        :raises: IOError, OSError
+
+        '''
+        return self._contents[self.key(path)]
+
+    def clear(self):
+        ''' Drop all the stored contents.
+        '''
+        with self._lock:
+            self._contents.clear()
+            self._keys.clear()
+            self._references.clear()
+
+    def __len__(self):
+        return len(self._contents)
+
+
+#: The store shared by all the template contents.
+content_store = ContentStore()
+
+
+class TemplateContent(object):
+    ''' Lazy accessor to the content of a template file.
+
+    The file is read the first time the content is requested, and kept
+    in the shared :data:`content_store`, hence registering templates does
+    not depend on the size of their files.
+
+    :param path: The path of the template file.
+    :type path: str
+
+    '''
+    __slots__ = ('path',)
+
+    def __init__(self, path):
+        self.path = path
+
+    def read(self):
+        ''' Return the content of the template file.
+
+        :returns:  str -- the file content.
+        :raises: IOError
+
+        '''
+        return content_store.read(self.path)
+
+    @property
+    def key(self):
+        ''' The key of the content in the shared :data:`content_store`.
+        '''
+        return content_store.key(self.path)
+
+    def __str__(self):
+        return self.read()
+
+    def __repr__(self):
+        return '{0}({1!r})'.format(self.__class__.__name__, self.path)
+
+    def __eq__(self, other):
+        if isinstance(other, TemplateContent):
+            return self.path == other.path or self.key == other.key
+
+        if isinstance(other, basestring):
+            return self.read() == other
+
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+
+        return not result
+
+    __hash__ = None
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+class StoredContent(TemplateContent):
+    ''' Content of a template file held only by the :data:`content_store`.
+
+    Used by the templates loaded from an artifact, which do not
+    depend on the template files being available.
+
+    :param path: The path the template file was registered from.
+    :type path: str
+    :param key: The key of the content in the shared :data:`content_store`.
+    :type key: str
+
+    '''
+    __slots__ = ('_key',)
+
+    def __init__(self, path, key):
+        super(StoredContent, self).__init__(path)
+        self._key = key
+
+    def read(self):
+        return content_store.get(self._key)
+
+    @property
+    def key(self):
+        return self._key
+
+
+def read_content(content):
+    ''' Return the given template *content* as string.
+
+    :param content: The content of a resolved entry.
+    :type content: str or TemplateContent
+    :returns:  str -- the content.
+
+    '''
+    if isinstance(content, TemplateContent):
+        return content.read()
+
+    return content or ''
@@ -6,8 +6,16 @@ Construct and parse results of the teplate manager
 '''
 import os
 import re
+import stat
+import errno
 from pprint import pformat
-from ade.manager.exceptions import ConfigError
+from collections import deque
+from itertools import islice
+from multiprocessing.pool import ThreadPool
+from ade.manager.exceptions import ConfigError, TemplateError
+from ade.manager.content import read_content
+from ade.manager.parser import TemplateParser, CACHE_SIZE
+from ade.manager.scan import scandir
 
 try:
     import efesto_logger as logging
@@ -17,6 +25,26 @@ except:
 
 logger = logging.getLogger(__name__)
 
+#: Number of records per build worker built ahead of the consumer,
+#: see :meth:`FileSystemManager.build_many`.
+BUILD_AHEAD = 2
+
+
+def current_umask():
+    ''' Return the umask of the process, None on windows, where
+    permissions are not handled.
+
+    The umask can only be read by setting it, which affects the whole
+    process: read it once, before creating paths from several threads.
+
+    '''
+    if os.name != 'posix':
+        return None
+
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
 
 class FileSystemManager(object):
     ''' Return an instance of FileSystemManager.
@@ -26,6 +54,9 @@ class FileSystemManager(object):
     :param template_manager: An instance of the templateManager.
     :type template_manager: TemplateManager
 
+    The parsers stored in the artifact loaded by the *template_manager*,
+    if any, are used as long as they match the ``regexp_mapping``.
+
     '''
 
     def __init__(self, config, template_manager):
@@ -38,6 +69,30 @@ class FileSystemManager(object):
 
         self.regexp_extractor = '(?P<prefix>.+)?(\+)(?P<variable>.+)(\+)(?P<suffix>.+)?'
 
+        self.build_workers = int(config.get('build_workers', 1))
+
+        self.parse_cache_size = int(
+            config.get('parse_cache_size', CACHE_SIZE)
+        )
+
+        # The path components of the parsers by template name, along
+        # with the resolved template and the regexp_mapping they were
+        # built from, and once used, their parser
+        self._parsers = {}
+        artifact = template_manager.artifact
+        if artifact is not None and artifact.regexp_mapping == self.regexp_mapping:
+            for name, parsers in artifact.parsers.items():
+                self._parsers[name] = (
+                    artifact.compiled[name], artifact.regexp_mapping,
+                    parsers, None
+                )
+
+        # The parser of all the templates, see detect
+        self._detector = None
+
+        # The compiled regexp_mapping values, validating the build data
+        self._validators = {}
+
     def build(self, name, data, path):
         ''' Build the given schema name, and replace data,
         level defines the depth of the built paths.
@@ -49,6 +104,389 @@ class FileSystemManager(object):
         :param path: the path where the structure has to be created.
         :type name: str
         '''
+        current_path = self._build_root(name, path)
+        if current_path is None:
+            return
+
+        built = self.template_manager.resolve_template(name)
+        results = self.template_manager.iter_resolve(built)
+        path_results = self._to_path(results, data)
+
+        pool = self._build_pool()
+        try:
+            self._create_entries(
+                pool, current_path, path_results, current_umask()
+            )
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        return path_results
+
+    def build_many(self, name, data_iter, path):
+        ''' Build the given schema name once for each of the data
+        records, yielding the built paths as each record gets built.
+
+        The template and its paths are resolved only once for all the
+        records. Records are built concurrently when the config sets
+        more than one ``build_workers``, each record creating its
+        paths in order, and results are yielded in the records order.
+        Only a few records per worker are built ahead of the consumer,
+        and none once the generator is closed.
+
+        A record failing to build, eg: with invalid data, is yielded
+        along with its error, and the following records get built.
+
+        :param name: The template *name* to build.
+        :type name: str
+        :param data_iter: The sets of data to fill the template with,
+                          any iterable.
+        :type data_iter: iterable
+        :param path: the path where the structures have to be created.
+        :type path: str
+        :returns:  generator -- each data record, its built paths, as
+                   returned by :meth:`build`, and its error, None if
+                   it got built.
+
+        .. code-block:: python
+
+            shots = (dict(show='foo', shot=shot) for shot in shots)
+            records = manager.build_many('@+shot+@', shots, '/tmp')
+            for data, paths, error in records:
+                print data['shot'], error or len(paths)
+
+        '''
+        current_path = self._build_root(name, path)
+        if current_path is None:
+            return
+
+        built = self.template_manager.resolve_template(name)
+        formatters = self._to_formatters(
+            self.template_manager.iter_resolve(built)
+        )
+
+        # Read once, the workers must not set the umask of the process
+        umask = current_umask()
+
+        def build(data):
+            try:
+                path_results = self._format_paths(formatters, data)
+                self._create_entries(None, current_path, path_results, umask)
+            except Exception as error:
+                logger.warning('Could not build {0}: {1}'.format(data, error))
+                return data, [], error
+
+            return data, path_results, None
+
+        records = iter(data_iter)
+        pool = self._build_pool()
+        if pool is None:
+            for data in records:
+                yield build(data)
+
+            return
+
+        try:
+            # Keep a few records per worker in flight
+            pending = deque(
+                pool.apply_async(build, (data,)) for data
+                in islice(records, BUILD_AHEAD * self.build_workers)
+            )
+            while pending:
+                record = pending.popleft().get()
+                for data in islice(records, 1):
+                    pending.append(pool.apply_async(build, (data,)))
+
+                yield record
+        except (GeneratorExit, Exception):
+            # Drop the pending records
+            pool.terminate()
+            raise
+        else:
+            pool.close()
+        finally:
+            pool.join()
+
+    def build_incremental(self, name, data, path):
+        ''' Build the given schema name, and replace data, creating,
+        writing or changing the permission of the paths only where
+        they are missing or different.
+
+        The existing paths are scanned once, before any change. Paths
+        existing as another type are skipped, along with everything below them.
+
+        :param name: The template *name* to build.
+        :type name: str
+        :param data: A set of data to fill the template with.
+        :type data: dict
+        :param path: the path where the structure has to be created.
+        :type path: str
+        :returns:  dict -- the *created*, *written*, *permissions*,
+                   *unchanged* and *skipped* paths, relative to *path*,
+                   and the *failed* ones, which could not be created,
+                   written or whose permission could not be set.
+
+        .. code-block:: python
+
+            summary = manager.build_incremental('@+show+@', data, '/tmp')
+            print len(summary['created']), 'paths created'
+
+        '''
+        current_path = self._build_root(name, path)
+        if current_path is None:
+            return
+
+        built = self.template_manager.resolve_template(name)
+        results = self.template_manager.iter_resolve(built)
+        path_results = self._to_path(results, data)
+        created, written, permissions, unchanged, skipped = (
+            self._diff_existing(current_path, path_results)
+        )
+        rewrites, permissions_left = self._rewrites(written, permissions)
+
+        def rewrite(item):
+            result, operations = item
+            for operation in operations:
+                if operation == 'write':
+                    done = self._write_file(current_path, result)
+                else:
+                    done = self._set_permission(current_path, result)
+
+                if not done:
+                    return result['path']
+
+        def set_permission(result):
+            if not self._set_permission(current_path, result):
+                return result['path']
+
+        failed = set()
+        pool = self._build_pool()
+        try:
+            failed.update(
+                result['path'] for result
+                in self._create_entries(
+                    pool, current_path, created, current_umask()
+                )
+            )
+            failed.update(self._map(pool, rewrite, rewrites))
+            levels = self._levels(permissions_left)
+            for depth in sorted(levels, reverse=True):
+                failed.update(self._map(pool, set_permission, levels[depth]))
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        failed.discard(None)
+        summary = dict(
+            created=[
+                result['path'] for result in created
+                if result['path'] not in failed
+            ],
+            written=[
+                result['path'] for result in written
+                if result['path'] not in failed
+            ],
+            permissions=[
+                result['path'] for result in permissions
+                if result['path'] not in failed
+            ],
+            unchanged=[result['path'] for result in unchanged],
+            skipped=[result['path'] for result in skipped],
+            failed=[
+                result['path'] for result in path_results
+                if result['path'] in failed
+            ]
+        )
+        logger.info(
+            'Built {0} in {1}: {2} created, {3} written, '
+            '{4} permissions changed, {5} unchanged, {6} skipped, '
+            '{7} failed'.format(
+                name, current_path, len(summary['created']),
+                len(summary['written']),
+                len(summary['permissions']), len(unchanged), len(skipped),
+                len(summary['failed'])
+            )
+        )
+        return summary
+
+    def build_plan(self, name, data, path, incremental=False):
+        ''' Return the operations building the given schema name,
+        and replace data, without changing anything on disk.
+
+        :param name: The template *name* to build.
+        :type name: str
+        :param data: A set of data to fill the template with.
+        :type data: dict
+        :param path: the path where the structure has to be created.
+        :type path: str
+        :param incremental: Plan the operations of
+                            :meth:`build_incremental` instead of
+                            :meth:`build`, scanning the existing paths.
+        :type incremental: bool
+        :returns:  dict -- the *operations*, in order, each with its
+                   *operation* (mkdir, write or chmod), *path* and
+                   *permission*, and the *size* of the written files,
+                   along with the number of created *inodes*
+                   and of written *bytes*.
+
+        .. code-block:: python
+
+            plan = manager.build_plan('@+shot+@', data, '/tmp')
+            print plan['inodes'], 'inodes', plan['bytes'], 'bytes'
+
+        '''
+        current_path = self._build_root(name, path)
+        if current_path is None:
+            return
+
+        built = self.template_manager.resolve_template(name)
+        results = self.template_manager.iter_resolve(built)
+        path_results = self._to_path(results, data)
+
+        umask = current_umask()
+        if incremental:
+            created, written, permissions, unchanged, skipped = (
+                self._diff_existing(current_path, path_results)
+            )
+        else:
+            created, written, permissions = path_results, [], []
+
+        # Same order as the operations of the build
+        operations = []
+        levels = self._levels(created)
+        for depth in sorted(levels):
+            for result in levels[depth]:
+                operations.append(self._plan_operation(
+                    'mkdir' if result['folder'] else 'write',
+                    current_path, result
+                ))
+
+        for depth in sorted(levels, reverse=True):
+            for result in levels[depth][::-1]:
+                if self._needs_permission(result, umask):
+                    operations.append(
+                        self._plan_operation('chmod', current_path, result)
+                    )
+
+        rewrites, permissions = self._rewrites(written, permissions)
+        for result, rewrite in rewrites:
+            for operation in rewrite:
+                operations.append(
+                    self._plan_operation(operation, current_path, result)
+                )
+
+        levels = self._levels(permissions)
+        for depth in sorted(levels, reverse=True):
+            for result in levels[depth]:
+                operations.append(
+                    self._plan_operation('chmod', current_path, result)
+                )
+
+        return dict(
+            operations=operations,
+            inodes=len(created),
+            bytes=sum(
+                operation['size'] for operation in operations
+                if operation['operation'] == 'write'
+            )
+        )
+
+    def _plan_operation(self, operation, root, result):
+        ''' Return the planned *operation* on the path *result*.
+        '''
+        planned = dict(
+            operation=operation,
+            path=os.path.join(root, result['path']),
+            permission=result['permission']
+        )
+        if operation == 'write':
+            planned['size'] = len(read_content(result['content']))
+
+        return planned
+
+    def _diff_existing(self, root, path_results):
+        ''' Return the *path_results* to create, to write, whose
+        permission to set, unchanged and skipped, compared to the paths
+        existing in *root*.
+        '''
+        existing = self._scan_existing(root, path_results)
+
+        created = []
+        written = []
+        permissions = []
+        unchanged = []
+        skipped = []
+        blocked = ()
+        for result in path_results:
+            # Nothing is created below a path existing as another type
+            if result['path'].startswith(blocked):
+                skipped.append(result)
+                continue
+
+            stats = existing.get(result['path'])
+            if stats is None:
+                created.append(result)
+                continue
+
+            if result['folder'] != stat.S_ISDIR(stats.st_mode):
+                logger.warning('{0} exists as another type, skipping'.format(
+                    os.path.join(root, result['path'])
+                ))
+                skipped.append(result)
+                blocked += (result['path'] + os.sep,)
+                continue
+
+            changed = False
+            if not result['folder'] and self._content_differs(
+                root, result, stats
+            ):
+                written.append(result)
+                changed = True
+
+            # Permissions are not handled on windows
+            if (
+                os.name == 'posix' and
+                stat.S_IMODE(stats.st_mode) != int(result['permission'], 8)
+            ):
+                permissions.append(result)
+                changed = True
+
+            if not changed:
+                unchanged.append(result)
+
+        return created, written, permissions, unchanged, skipped
+
+    def _rewrites(self, written, permissions):
+        ''' Return the operations rewriting each of the existing files
+        *written*, and the *permissions* left to set afterwards.
+
+        Files whose permission changes too get it before being written
+        when it lets the owner write them, after otherwise, so read only
+        files can be written either way.
+        '''
+        changed = set(result['path'] for result in permissions)
+        rewrites = []
+        for result in written:
+            operations = ['write']
+            if result['path'] in changed:
+                if int(result['permission'], 8) & stat.S_IWUSR:
+                    operations.insert(0, 'chmod')
+                else:
+                    operations.append('chmod')
+
+            rewrites.append((result, operations))
+
+        written = set(result['path'] for result in written)
+        permissions = [
+            result for result in permissions if result['path'] not in written
+        ]
+        return rewrites, permissions
+
+    def _build_root(self, name, path):
+        ''' Return the real path to build *name* in, None if invalid.
+        '''
         current_path = path or self.mount_point
         current_path = os.path.realpath(current_path)
 
@@ -61,48 +499,235 @@ class FileSystemManager(object):
                 ('Structure can not be created'
                  ' outside of mount_point {0}').format(self.mount_point)
             )
-            return
+            return None
 
         if not os.path.exists(current_path):
             logger.error('Path {0} does not exist.'.format(self.mount_point))
-            return
+            return None
 
-        built = self.template_manager.resolve_template(name)
-        results = self.template_manager.resolve(built)
-        path_results = self._to_path(results, data)
-        for result in path_results:
-            path = os.path.join(current_path, result['path'])
+        return current_path
+
+    def _scan_existing(self, root, path_results):
+        ''' Return the stat of the *path_results* existing in *root*,
+        by path, scanning each existing folder once.
+        '''
+        planned = set(result['path'] for result in path_results)
+        existing = {}
+        folders = ['']
+        while folders:
+            folder = folders.pop()
             try:
-                if result['folder']:
-                    #: Create the folder
-                    logger.debug('creating folder: {0}'.format(path))
-                    os.makedirs(path)
-                else:
-                    logger.debug('creating file: {0}'.format(path))
-                    file_content = result['content']
-                    with open(path, 'w') as file_data:
-                        file_data.write(file_content)
-
-            except (IOError, OSError) as error:
-                logger.debug('{0}'.format(error))
-                pass
-
-        #: Set permissions, using the reversed results
-        # only if on posix , windows permissions are not handled
-        if os.name == 'posix':
-            for result in reversed(path_results):
-                path = os.path.join(current_path, result['path'])
-                permission = result['permission']
-                permission = int(permission, 8)
-                logger.debug('Setting permission of {1} as {0}'.format(
-                    oct(permission), os.path.realpath(path)
-                ))
+                entries = scandir(os.path.join(root, folder))
+            except OSError as error:
+                logger.debug(error)
+                continue
+
+            for entry in entries:
+                entry_path = os.path.join(folder, entry.name)
+                if entry_path not in planned:
+                    continue
+
                 try:
-                    os.chmod(path, permission)
-                except OSError, error:
+                    stats = entry.stat()
+                except OSError as error:
                     logger.debug(error)
+                    continue
 
-        return path_results
+                existing[entry_path] = stats
+                if stat.S_ISDIR(stats.st_mode):
+                    folders.append(entry_path)
+
+        return existing
+
+    def _content_differs(self, root, result, stats):
+        ''' Return whether the existing file of *result* has another content.
+        '''
+        content = read_content(result['content'])
+        if len(content) != stats.st_size:
+            return True
+
+        try:
+            with open(os.path.join(root, result['path'])) as file_data:
+                return file_data.read() != content
+        except IOError as error:
+            logger.debug(error)
+            return True
+
+    def _build_pool(self):
+        ''' Return the thread pool of the build, None if not parallel.
+        '''
+        if self.build_workers > 1:
+            return ThreadPool(self.build_workers)
+
+        return None
+
+    def _create_entries(self, pool, root, path_results, umask):
+        ''' Create the *path_results* in *root*, with their permissions.
+
+        Entries are created one depth level at a time, concurrently on
+        the *pool* when given, so parents always exist before children.
+        Entries get their permission when created, and are changed
+        afterwards, from the deepest level up, only when the *umask* or
+        their existence prevented it. The *umask* is read once by the
+        caller, see :func:`current_umask`, None skips the permissions.
+
+        :returns:  list -- the *path_results* which could not be created.
+
+        '''
+        levels = self._levels(path_results)
+        depths = sorted(levels)
+
+        def create(result):
+            return self._create_entry(root, result, umask)
+
+        def set_permission(result):
+            self._set_permission(root, result)
+
+        pending = {}
+        failed = []
+        for depth in depths:
+            pending[depth] = []
+            created = self._map(pool, create, levels[depth])
+            for result, (done, changed) in zip(levels[depth], created):
+                if not done:
+                    failed.append(result)
+                elif changed:
+                    pending[depth].append(result)
+
+        for depth in reversed(depths):
+            self._map(pool, set_permission, pending[depth][::-1])
+
+        return failed
+
+    def _levels(self, path_results):
+        ''' Return the *path_results* grouped by depth.
+        '''
+        levels = {}
+        for result in path_results:
+            levels.setdefault(result['path'].count(os.sep), []).append(result)
+
+        return levels
+
+    def _map(self, pool, function, items):
+        ''' Call *function* on each of the *items*, on the *pool* if given.
+
+        :returns:  list -- the results of *function*, in order.
+
+        '''
+        if pool is not None and len(items) > 1:
+            return pool.map(function, items)
+
+        return [function(item) for item in items]
+
+    def _create_entry(self, root, result, umask=None):
+        ''' Create the folder or file of the given path *result*,
+        with its permission.
+
+        :param root: The path to create the *result* in.
+        :type root: str
+        :param result: The path result, as returned by :meth:`_to_path`.
+        :type result: dict
+        :param umask: The umask of the process, None to skip permissions.
+        :type umask: int
+        :returns:  tuple -- whether the path was created, and whether
+                   its permission has to be set afterwards.
+
+        '''
+        path = os.path.join(root, result['path'])
+        mode = self._creation_mode(result)
+
+        changed = False
+        try:
+            if result['folder']:
+                #: Create the folder
+                logger.debug('creating folder: {0}'.format(path))
+                try:
+                    os.makedirs(path, mode)
+                except OSError as error:
+                    if error.errno != errno.EEXIST or not os.path.isdir(path):
+                        raise
+
+                    # Existing folders keep their permission
+                    logger.debug('{0}'.format(error))
+                    changed = True
+            else:
+                logger.debug('creating file: {0}'.format(path))
+                file_content = read_content(result['content'])
+                try:
+                    handle = os.open(
+                        path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, mode
+                    )
+                except OSError as error:
+                    if error.errno != errno.EEXIST:
+                        raise
+
+                    # Existing files keep their permission
+                    changed = True
+                    handle = os.open(path, os.O_WRONLY | os.O_TRUNC)
+
+                with os.fdopen(handle, 'w') as file_data:
+                    file_data.write(file_content)
+
+        except (IOError, OSError) as error:
+            logger.warning('{0} could not be created: {1}'.format(path, error))
+            return False, False
+
+        if umask is None:
+            return True, False
+
+        return True, changed or self._needs_permission(result, umask)
+
+    def _creation_mode(self, result):
+        ''' Return the mode to create the path *result* with.
+        '''
+        mode = int(result['permission'], 8)
+        if result['folder']:
+            # Keep folders writable until their children are created
+            mode |= stat.S_IRWXU
+
+        return mode
+
+    def _needs_permission(self, result, umask):
+        ''' Return whether the path *result* created with the *umask*
+        needs its permission to be set afterwards.
+        '''
+        if umask is None:
+            return False
+
+        mode = self._creation_mode(result) & ~umask
+        return mode != int(result['permission'], 8)
+
+    def _write_file(self, root, result):
+        ''' Write the content of the existing file of *result*,
+        return whether it got written.
+        '''
+        path = os.path.join(root, result['path'])
+        logger.debug('writing file: {0}'.format(path))
+        try:
+            with open(path, 'w') as file_data:
+                file_data.write(read_content(result['content']))
+        except IOError as error:
+            logger.warning(error)
+            return False
+
+        return True
+
+    def _set_permission(self, root, result):
+        ''' Set the permission of the given path *result*,
+        return whether it got set.
+        '''
+        path = os.path.join(root, result['path'])
+        permission = int(result['permission'], 8)
+        logger.debug('Setting permission of {1} as {0}'.format(
+            oct(permission), path
+        ))
+        try:
+            os.chmod(path, permission)
+        except OSError, error:
+            logger.debug(error)
+            return False
+
+        return True
 
     def parse(self, path, name):
         ''' Parse the provided path against
@@ -113,6 +738,172 @@ class FileSystemManager(object):
         :param name: The teplate name to parse against.
         :type name: str
 
+        '''
+        path = self._relative_path(path)
+        if path is None:
+            return []
+
+        logger.debug('Parsing {0} against {1}'.format(name, path))
+        built = self.template_manager.resolve_template(name)
+        return self._parse(self._get_parser(name, built), path)
+
+    def parse_many(self, paths, name):
+        ''' Parse each of the provided paths against
+        the given schema name, yielding the results as they get parsed.
+
+        The template gets resolved, and its parser built, only once
+        for all the *paths*.
+
+        :param paths: The paths to be parsed, any iterable.
+        :type paths: iterable
+        :param name: The teplate name to parse against.
+        :type name: str
+        :returns:  generator -- the parsed path and its results, as
+                   returned by :meth:`parse`.
+
+        .. code-block:: python
+
+            with open('render.log') as paths:
+                paths = (path.strip() for path in paths)
+                for path, results in manager.parse_many(paths, '@+show+@'):
+                    print path, results
+
+        '''
+        built = self.template_manager.resolve_template(name)
+        parser = self._get_parser(name, built)
+        for path in paths:
+            relative_path = self._relative_path(path)
+            if relative_path is None:
+                yield path, []
+                continue
+
+            yield path, self._parse(parser, relative_path)
+
+    def detect(self, path, names=None):
+        ''' Parse the provided path against all the registered templates,
+        and return the best match.
+
+        All the templates are parsed at once, through a single parser.
+        Templates can be mounted anywhere in the mount point, hence each
+        template can match the trailing part of the path starting at any
+        of its components. The best match is the most specific one: the
+        one matching the most literal components, then the one covering
+        the most of the path, then the one of the first template, in the
+        order of *names*.
+
+        :param path: The *path* to be parsed.
+        :type path: str
+        :param names: The templates to parse against, in order of
+                      preference, defaults to all the registered ones.
+        :type names: list
+        :returns:  dict -- the matched *template* name, the *root* folder
+                   it is mounted in, the path of the matched *entry* in
+                   the template, and the parsed *data*,
+                   None if no template matched.
+
+        .. code-block:: python
+
+            manager.detect('/tmp/AA/AA001/maya/scenes')
+            # {'template': '@+sequence+@',
+            #  'root': '/tmp',
+            #  'entry': ['+sequence+', '+shot+', 'maya', 'scenes'],
+            #  'data': {'sequence': 'AA', 'shot': 'AA001'}}
+
+        '''
+        path = self._relative_path(path)
+        if path is None:
+            return None
+
+        detector, entries = self._get_detector(names)
+        components = path.split(os.sep)
+        best = None
+        for offset in range(len(components)):
+            # No match further down can match more literal components
+            if best is not None and -best[0][0] >= len(components) - offset:
+                break
+
+            found = detector.search((os.sep).join(components[offset:]))
+            if found is None:
+                continue
+
+            priority, data = found
+            name, entry, literals, order = entries[priority]
+            rank = (-literals, offset, order, priority)
+            if best is None or rank < best[0]:
+                best = (rank, name, entry, data, offset)
+
+        if best is None:
+            logger.debug('no template found for {0}'.format(path))
+            return None
+
+        rank, name, entry, data, offset = best
+        root = os.path.join(self.mount_point, *components[:offset])
+        return dict(template=name, root=root, entry=entry, data=data)
+
+    def _get_detector(self, names=None):
+        ''' Return the parser of all the templates *names*, and the
+        template name, entry path, number of literal components and
+        template order of each of its parsers.
+
+        The parser is cached, and built again only when the register,
+        the regexp_mapping or the *names* change.
+
+        '''
+        if names is not None:
+            names = tuple(names)
+
+        key = (self.template_manager.generation, names)
+        cached = self._detector
+        if (
+            cached is not None and cached[0] == key and
+            cached[1] == self.regexp_mapping
+        ):
+            return cached[2], cached[3]
+
+        if names is None:
+            template_names = self.template_manager.template_names
+        else:
+            template_names = names
+
+        logger.debug('Building parsers of {0}'.format(template_names))
+        catcher = re.compile(self.regexp_extractor)
+        parsers = []
+        for order, name in enumerate(template_names):
+            try:
+                built = self.template_manager.resolve_template(name)
+                template_parsers = []
+                for entry in self.template_manager.iter_resolve(built):
+                    entry_path = entry['path']
+                    components = self._entry_components(entry_path, catcher)
+                    variables = len([
+                        item for item in entry_path if catcher.match(item)
+                    ])
+                    template_parsers.append((
+                        variables, order, len((os.sep).join(components)),
+                        components, name, entry_path,
+                        len(entry_path) - variables
+                    ))
+            except (KeyError, TemplateError, ConfigError) as error:
+                logger.debug('Skipping template {0}: {1}'.format(name, error))
+                continue
+
+            parsers.extend(template_parsers)
+
+        parsers.sort(key=lambda parser: parser[:3])
+        detector = TemplateParser(
+            [parser[3] for parser in parsers], self.parse_cache_size
+        )
+        entries = [
+            (parser[4], parser[5], parser[6], parser[1]) for parser in parsers
+        ]
+        self._detector = (
+            key, dict(self.regexp_mapping), detector, entries
+        )
+        return detector, entries
+
+    def _relative_path(self, path):
+        ''' Return the given *path* relative to the mount point,
+        None if it is not contained in the mount point.
         '''
         # remove trailing slash from path
         if path.endswith(os.sep):
@@ -125,94 +916,115 @@ class FileSystemManager(object):
                     path, self.mount_point
                 )
             )
-            return []
+            return None
 
         path = path.split(self.mount_point)[-1]
         if path.startswith(os.sep):
             path = path[1:]
 
-        logger.debug('Parsing {0} against {1}'.format(name, path))
-        matched_results = []
-        built = self.template_manager.resolve_template(name)
-        results = self.template_manager.resolve(built)
-        parsers = self._to_parser(results)
-
-        for parser in parsers:
-            logger.debug('Creating parser : {0}'.format(parser))
-            check = re.compile(parser)
-            match = check.match(path)
-            if not match:
-                logger.debug('no match found for {0} with {1}'.format(
-                    path, parser
-                ))
-                continue
+        return path
 
-            logger.debug('Match found for {0} with {1}'.format(
-                path, parser
-            ))
-            result = match.groupdict()
-            if result and result not in matched_results:
-                matched_results.append(result)
-            break
+    def _parse(self, parser, path):
+        ''' Return the results of the relative *path* matched by *parser*.
+        '''
+        result = parser.match(path)
+        if not result:
+            logger.debug('no match found for {0}'.format(path))
+            return []
 
-        matched_results.sort()
-        matched_results.reverse()
-        return matched_results or []
+        return [result]
 
-    def _to_parser(self, paths):
-        ''' Recursively build a parser from the
-        given set of schema paths
+    def _get_parser(self, name, built):
+        ''' Return the parser of the resolved template *built*.
+
+        Parsers are cached by template name, and built again only when
+        the resolved template or the regexp_mapping change.
+
+        :param name: The template *name*.
+        :type name: str
+        :param built: The resolved template *name*.
+        :type built: dict
+        :returns:  TemplateParser -- the parser of the template.
+        :raises: ConfigError
+
+        '''
+        cached = self._parsers.get(name)
+        if (
+            cached is None or cached[0] is not built or
+            cached[1] != self.regexp_mapping
+        ):
+            logger.debug('Building parsers of {0}'.format(name))
+            results = self.template_manager.iter_resolve(built)
+            cached = (
+                built, dict(self.regexp_mapping),
+                self._to_components(results), None
+            )
+
+        built, regexp_mapping, components, parser = cached
+        if parser is None:
+            parser = TemplateParser(components, self.parse_cache_size)
+            self._parsers[name] = (built, regexp_mapping, components, parser)
+
+        return parser
+
+    def _to_components(self, paths):
+        ''' Build the regular expressions of the path components
+        of the given set of schema paths, shortest parser first.
 
         '''
-        result_paths = []
         catcher = re.compile(self.regexp_extractor)
-        for path in paths:
-            result_path = []
-            path = path['path']
-            for entry in path:
-                matches = catcher.match(entry)
-                if matches:
-                    data = matches.groupdict()
-                    prefix = data.get('prefix')
-                    entry = data.get('variable')
-                    suffix = data.get('suffix')
-                    parser = self.regexp_mapping.get(
-                        entry
-                    )
+        result_paths = [
+            self._entry_components(path['path'], catcher) for path in paths
+        ]
 
-                    try:
-                        entry = parser.format(entry)
+        # Same order as the parsers, sorted by length
+        result_paths.sort(key=lambda components: len((os.sep).join(components)))
+        return result_paths
 
-                    except AttributeError:
-                        raise ConfigError(
-                            'Regular expression not found for: {0}'.format(
-                                entry
-                            )
-                        )
+    def _entry_components(self, path, catcher):
+        ''' Build the regular expressions of the components of *path*.
+        '''
+        result_path = []
+        for entry in path:
+            matches = catcher.match(entry)
+            if matches:
+                data = matches.groupdict()
+                prefix = data.get('prefix')
+                entry = data.get('variable')
+                suffix = data.get('suffix')
+                parser = self.regexp_mapping.get(
+                    entry
+                )
 
-                    if prefix:
-                        entry = prefix+entry
+                try:
+                    entry = parser.format(entry)
 
-                    if suffix:
-                        entry = entry+suffix
+                except AttributeError:
+                    raise ConfigError(
+                        'Regular expression not found for: {0}'.format(
+                            entry
+                        )
+                    )
 
-                result_path.append(entry)
+                if prefix:
+                    entry = prefix+entry
 
-            # Enforce checking with ^$
-            # TODO: Protect slashes with backslashes in (os.sep*2).join...
-            formatted_path = (os.sep).join(result_path)
-            result_path = r'^{0}$'.format(formatted_path)
-            logger.debug('Building regex : {0}'.format(result_path))
-            result_paths.append(result_path)
+                if suffix:
+                    entry = entry+suffix
 
-        result_paths.sort(key=len)
-        return result_paths
+            result_path.append(entry)
+
+        return result_path
 
     def _validate_data(self, data):
         # validate build folder against regexps
         for name, value in data.items():
             if name in self.regexp_mapping:
-                regexp = re.compile(self.regexp_mapping[name])
+                regexp = self._validators.get(self.regexp_mapping[name])
+                if regexp is None:
+                    regexp = re.compile(self.regexp_mapping[name])
+                    self._validators[self.regexp_mapping[name]] = regexp
+
                 match = regexp.match(value)
                 if not match:
                     logger.debug(
@@ -239,11 +1051,16 @@ class FileSystemManager(object):
         set of schema paths.
 
         '''
-        data = data or dict()
-        self._set_default_values(data)
-        self._validate_data(data)
+        return self._format_paths(self._to_formatters(paths), data)
+
+    def _to_formatters(self, paths):
+        ''' Build the format strings of the given set of schema paths,
+        along with their entry, to be filled with data by
+        :meth:`_format_paths`.
+
+        '''
         catcher = re.compile(self.regexp_extractor)
-        result_paths = []
+        formatters = []
         for entry in paths:
             result_path = []
             for item in entry['path']:
@@ -264,20 +1081,31 @@ class FileSystemManager(object):
 
                 result_path.append(item)
 
-            isnotinresults = result_path not in result_paths
-            if isnotinresults:
-                final_path = (os.sep).join(result_path)
-                logger.debug('Building path for %s and data %s' % (final_path, data.keys()))
-                try:
-                    final_path = final_path.format(**data)
+            formatters.append(((os.sep).join(result_path), entry))
 
-                except Exception, error:
-                    continue
-                entry['path'] = final_path
-                result_paths.append(entry)
-            else:
-                logger.debug('{0} already in {1}'.format(
-                    result_path, result_paths
-                    ))
+        return formatters
+
+    def _format_paths(self, formatters, data):
+        ''' Build the list of paths of the given *formatters*,
+        filled with *data*.
+
+        '''
+        data = data or dict()
+        self._set_default_values(data)
+        self._validate_data(data)
+        result_paths = []
+        for final_path, entry in formatters:
+            logger.debug('Building path for %s and data %s' % (final_path, data.keys()))
+            try:
+                final_path = final_path.format(**data)
+
+            except Exception, error:
+                continue
+            result_paths.append(dict(
+                path=final_path,
+                permission=entry['permission'],
+                folder=entry['folder'],
+                content=entry['content']
+            ))
 
         return result_paths
@@ -0,0 +1,289 @@
+'''
+Path index
+
+Provide an index over the resolved entries of a compiled template,
+answering :meth:`~ade.manager.template.TemplateManager.find_path`
+queries without walking all the resolved paths.
+
+'''
+from bisect import bisect_right
+
+try:
+    import efesto_logger as logging
+except:
+    import logging
+
+logger = logging.getLogger(__name__)
+
+#: The orders accepted by :meth:`PathIndex.iter_find`.
+ORDERS = ('traversal', 'depth', 'lexical')
+
+
+def sanitize_filter(var):
+    ''' Return the given path filter without variable markers.
+
+    :param var: The filter, eg: +shot+ or {shot}.
+    :type var: str
+    :returns:  str -- the sanitized filter, eg: shot.
+
+    '''
+    if not var:
+        return None
+
+    if '+' in var:
+        var = var.replace('+', '')
+
+    if '{' in var:
+        var = var[1:-1]
+
+    return var
+
+
+def _merge_ranges(ranges):
+    ''' Return the given ranges sorted, with the overlapping ones merged.
+    '''
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+
+    return merged
+
+
+class RangeSet(object):
+    ''' Sorted set of disjoint position ranges, end excluded.
+
+    :param ranges: The (start, end) ranges.
+    :type ranges: list
+
+    '''
+    __slots__ = ('ranges', 'starts')
+
+    def __init__(self, ranges):
+        self.ranges = _merge_ranges(ranges)
+        self.starts = [start for start, end in self.ranges]
+
+    def next_position(self, position):
+        ''' Return the first position in the set not lower than *position*.
+
+        :param position: The position to start from.
+        :type position: int
+        :returns:  int -- the found position, or None.
+
+        '''
+        index = bisect_right(self.starts, position) - 1
+        if index >= 0 and position < self.ranges[index][1]:
+            return position
+
+        if index + 1 < len(self.ranges):
+            return self.ranges[index + 1][0]
+
+        return None
+
+    def __contains__(self, position):
+        return self.next_position(position) == position
+
+    def __len__(self):
+        return sum(end - start for start, end in self.ranges)
+
+
+class PathIndex(object):
+    ''' Index of the resolved entries of a template.
+
+    Entries are stored depth first, so each entry and its descendants
+    take a contiguous range of positions. The index holds:
+
+    * the first component of the paths, shared by all the entries.
+    * an inverted index from each component to the ranges of the
+      entries whose path contains it.
+    * an index from the last component to the positions of the entries.
+
+    :param entries: The resolved entries, depth first.
+    :type entries: tuple
+
+    '''
+    def __init__(self, entries):
+        self.entries = entries
+        self._first = None
+        self._last = {}
+        self._components = {}
+        self._contains = {}
+        self._orders = {}
+
+        if not entries:
+            return
+
+        self._first = sanitize_filter(entries[0].name)
+
+        # Open entries, closed once the walk leaves their subtree
+        stack = []
+        for position, entry in enumerate(entries):
+            while stack and stack[-1][1] >= entry.depth:
+                self._close(stack.pop(), position)
+
+            stack.append((entry.name, entry.depth, position))
+            self._last.setdefault(
+                sanitize_filter(entry.name), []
+            ).append(position)
+
+        while stack:
+            self._close(stack.pop(), len(entries))
+
+    def _close(self, opened, end):
+        ''' Register the range of the *opened* entry, ending at *end*.
+        '''
+        name, depth, start = opened
+        self._components.setdefault(name, []).append((start, end))
+
+    def _contains_ranges(self, item):
+        ''' Return the ranges of the paths with a component containing *item*.
+        '''
+        ranges = self._contains.get(item)
+        if ranges is None:
+            # Components are far less than paths, scan them only once
+            matched = []
+            for component, component_ranges in self._components.items():
+                if item in component:
+                    matched.extend(component_ranges)
+
+            ranges = self._contains[item] = RangeSet(matched)
+
+        return ranges
+
+    def _range_sets(self, contains):
+        ''' Return the range sets of the *contains* items, smallest first.
+        '''
+        range_sets = [self._contains_ranges(item) for item in contains or []]
+        # Check the smallest sets first, they discard the most
+        range_sets.sort(key=len)
+        return range_sets
+
+    def _next_position(self, position, range_sets):
+        ''' Return the first position from *position* common to the sets.
+        '''
+        # Jump from range to range until all the sets agree
+        while position < len(self.entries):
+            moved = False
+            for ranges in range_sets:
+                found = ranges.next_position(position)
+                if found is None:
+                    return None
+
+                if found != position:
+                    position = found
+                    moved = True
+
+            if not moved:
+                return position
+
+        return None
+
+    def _ordered_positions(self, order):
+        ''' Return all the positions sorted by the given *order*.
+        '''
+        ordered = self._orders.get(order)
+        if ordered is None:
+            entries = self.entries
+            positions = range(len(entries))
+            if order == 'depth':
+                ordered = sorted(
+                    positions, key=lambda position: entries[position].depth
+                )
+            else:
+                ordered = sorted(
+                    positions, key=lambda position: entries[position].path
+                )
+
+            self._orders[order] = ordered
+
+        return ordered
+
+    def find(self, startwith=None, contains=None, endswith=None):
+        ''' Return the position of the first entry matching the filters.
+
+        :param startwith: The sanitized first component of the path.
+        :type startwith: str
+        :param contains: The items the path components have to contain.
+        :type contains: list
+        :param endswith: The sanitized last component of the path.
+        :type endswith: str
+        :returns:  int -- the position of the matched entry, or None.
+
+        '''
+        return next(self.iter_find(startwith, contains, endswith), None)
+
+    def iter_find(
+        self, startwith=None, contains=None, endswith=None, order='traversal'
+    ):
+        ''' Yield the positions of all the entries matching the filters.
+
+        :param startwith: The sanitized first component of the path.
+        :type startwith: str
+        :param contains: The items the path components have to contain.
+        :type contains: list
+        :param endswith: The sanitized last component of the path.
+        :type endswith: str
+        :param order: One of :data:`ORDERS`: *traversal* for the depth
+                      first order of the template, *depth* for the
+                      shallowest paths first, *lexical* for the paths
+                      sorted by their components.
+        :type order: str
+        :returns:  generator -- the positions of the matched entries.
+        :raises: ValueError
+
+        '''
+        if order not in ORDERS:
+            raise ValueError(
+                'order {0} not in {1}'.format(order, ', '.join(ORDERS))
+            )
+
+        if not self.entries:
+            return
+
+        if startwith and startwith != self._first:
+            return
+
+        range_sets = self._range_sets(contains)
+
+        if endswith:
+            candidates = self._last.get(endswith, [])
+            if order == 'depth':
+                candidates = sorted(
+                    candidates,
+                    key=lambda position: self.entries[position].depth
+                )
+            elif order == 'lexical':
+                candidates = sorted(
+                    candidates,
+                    key=lambda position: self.entries[position].path
+                )
+
+        elif order == 'traversal':
+            position = self._next_position(0, range_sets)
+            while position is not None:
+                yield position
+                position = self._next_position(position + 1, range_sets)
+
+            return
+
+        else:
+            candidates = self._ordered_positions(order)
+
+        for position in candidates:
+            if all(position in ranges for ranges in range_sets):
+                yield position
+
+    def find_path(self, startwith=None, contains=None, endswith=None):
+        ''' Return the path of the first entry matching the filters.
+
+        :returns:  list -- the matched path, or None.
+
+        '''
+        position = self.find(startwith, contains, endswith)
+        if position is None:
+            return None
+
+        return self.entries[position].path
@@ -0,0 +1,275 @@
+'''
+Template nodes
+
+Provide the compact, slotted, node types holding the registered and
+resolved templates. Nodes behave as read only dictionaries, and
+:meth:`NodeMapping.to_dict` turns them back into the plain dictionaries
+used by previous versions.
+
+'''
+import copy
+
+from ade.manager.content import TemplateContent, read_content
+
+
+def mapping_equal(items, other):
+    ''' Return whether the given *items* match the *other* mapping.
+
+    Children are stored as tuples by the nodes, and as lists by plain
+    dictionaries, so they get compared as lists.
+
+    :param items: The key and value pairs of the first mapping.
+    :type items: list
+    :param other: The second mapping.
+    :type other: dict
+    :returns:  bool -- True if the mappings are equal.
+
+    '''
+    if len(items) != len(other):
+        return False
+
+    for key, value in items:
+        if key not in other:
+            return False
+
+        other_value = other[key]
+        if isinstance(value, tuple):
+            value = list(value)
+
+        if isinstance(other_value, tuple):
+            other_value = list(other_value)
+
+        if value != other_value:
+            return False
+
+    return True
+
+
+def to_plain(value):
+    ''' Return the given node *value* as plain dictionaries and lists,
+    with the template contents read as strings.
+
+    :param value: The value to convert.
+    :type value: object
+    :returns:  object -- the converted value.
+
+    '''
+    if isinstance(value, NodeMapping):
+        return value.to_dict()
+
+    if isinstance(value, (tuple, list)):
+        return [to_plain(item) for item in value]
+
+    if isinstance(value, TemplateContent):
+        return read_content(value)
+
+    return value
+
+
+class NodeMapping(object):
+    ''' Read only dictionary interface over the slots of a node.
+
+    Subclasses define the exposed keys through :meth:`_keys`, each key
+    being served by the attribute with the same name.
+
+    '''
+    __slots__ = ()
+
+    def _keys(self):
+        raise NotImplementedError()
+
+    def keys(self):
+        return list(self._keys())
+
+    def values(self):
+        return [getattr(self, key) for key in self._keys()]
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in self._keys()]
+
+    def iterkeys(self):
+        return iter(self._keys())
+
+    def itervalues(self):
+        return (getattr(self, key) for key in self._keys())
+
+    def iteritems(self):
+        return ((key, getattr(self, key)) for key in self._keys())
+
+    def __iter__(self):
+        return iter(self._keys())
+
+    def __len__(self):
+        return len(self._keys())
+
+    def __contains__(self, key):
+        return key in self._keys()
+
+    def has_key(self, key):
+        return key in self._keys()
+
+    def __getitem__(self, key):
+        if key not in self._keys():
+            raise KeyError(key)
+
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        if key not in self._keys():
+            return default
+
+        return getattr(self, key)
+
+    def __eq__(self, other):
+        if not isinstance(other, (dict, NodeMapping)):
+            return NotImplemented
+
+        return mapping_equal(self.items(), other)
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+
+        return not result
+
+    __hash__ = None
+
+    def to_dict(self):
+        ''' Return the node as a plain dictionary, eg: to be json encoded.
+
+        Children are converted as well, and the contents of the files
+        are read.
+
+        :returns:  dict -- the node data.
+
+        .. code-block:: python
+
+            template = manager.get_template('@+show+@')
+            print json.dumps(template.to_dict())
+
+        '''
+        return dict((key, to_plain(value)) for key, value in self.iteritems())
+
+    def __copy__(self):
+        return dict(self.items())
+
+    def __deepcopy__(self, memo):
+        # Return plain, mutable, dictionaries and lists
+        copied = {}
+        for key, value in self.items():
+            if isinstance(value, tuple):
+                value = list(value)
+
+            copied[key] = copy.deepcopy(value, memo)
+
+        return copied
+
+    def __repr__(self):
+        return '{0}({1!r})'.format(
+            self.__class__.__name__, dict(self.items())
+        )
+
+
+class TemplateNode(NodeMapping):
+    ''' A registered or resolved template entry.
+
+    Folders hold their *children* as a tuple, files their *content*.
+
+    :param name: The entry name.
+    :type name: str
+    :param permission: The entry permission, in octal notation.
+    :type permission: str
+    :param folder: Whether the entry is a folder.
+    :type folder: bool
+    :param children: The entry children, folders only.
+    :type children: tuple
+    :param content: The entry content, files only.
+    :type content: TemplateContent
+
+    '''
+    __slots__ = ('name', 'permission', 'folder', 'children', 'content')
+
+    _base_keys = ('name', 'permission', 'folder')
+    _folder_keys = _base_keys + ('children',)
+    _file_keys = _base_keys + ('content',)
+
+    def __init__(
+        self, name, permission, folder=True, children=None, content=None
+    ):
+        self.name = name
+        self.permission = permission
+        self.folder = folder
+        self.children = children
+        self.content = content
+
+    def _keys(self):
+        if self.children is not None:
+            if self.content is not None:
+                return self._folder_keys + ('content',)
+
+            return self._folder_keys
+
+        if self.content is not None:
+            return self._file_keys
+
+        return self._base_keys
+
+    def __getstate__(self):
+        return tuple(getattr(self, key) for key in self.__slots__)
+
+    def __setstate__(self, state):
+        for key, value in zip(self.__slots__, state):
+            setattr(self, key, value)
+
+
+class ResolvedEntry(NodeMapping):
+    ''' A resolved path entry, as returned by
+    :meth:`~ade.manager.template.TemplateManager.resolve`.
+
+    Entries only hold their own name and a reference to their parent,
+    the full *path* is built on access.
+
+    :param schema: The resolved template entry.
+    :type schema: dict
+    :param parent: The parent entry, None for the root.
+    :type parent: ResolvedEntry
+
+    '''
+    __slots__ = ('schema', 'parent', 'name', 'depth')
+
+    _entry_keys = ('path', 'permission', 'folder', 'content')
+
+    def __init__(self, schema, parent=None):
+        self.schema = schema
+        self.parent = parent
+        self.name = schema.get('name').replace('@', '')
+        self.depth = parent.depth + 1 if parent is not None else 0
+
+    def _keys(self):
+        return self._entry_keys
+
+    @property
+    def path(self):
+        ''' The list of names from the root to this entry.
+        '''
+        path = []
+        entry = self
+        while entry is not None:
+            path.append(entry.name)
+            entry = entry.parent
+
+        path.reverse()
+        return path
+
+    @property
+    def permission(self):
+        return self.schema.get('permission', 777)
+
+    @property
+    def folder(self):
+        return self.schema.get('folder', True)
+
+    @property
+    def content(self):
+        return self.schema.get('content', '')
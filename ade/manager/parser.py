@@ -0,0 +1,179 @@
+'''
+Path parser
+
+Provide the parser of the paths built from a template, walking the path
+components through a trie of the template entries, and remembering the
+parsed prefixes so sibling paths share the parse of their parent.
+
+'''
+import os
+import re
+from collections import OrderedDict
+
+try:
+    import efesto_logger as logging
+except:
+    import logging
+
+logger = logging.getLogger(__name__)
+
+#: Default number of parsed prefixes remembered by a parser.
+CACHE_SIZE = 1024
+
+
+class _TrieNode(object):
+    ''' Node of the trie of the template entries.
+
+    :param component: The regular expression of the path component.
+    :type component: str
+
+    '''
+    __slots__ = ('component', 'pattern', 'children', 'priority')
+
+    def __init__(self, component=None):
+        self.component = component
+        self.pattern = None
+        if component is not None:
+            self.pattern = re.compile('^{0}$'.format(component))
+
+        self.children = []
+        self.priority = None
+
+
+class TemplateParser(object):
+    ''' Parser of the paths of a template.
+
+    Each parser is given as the list of the regular expressions of its
+    path components, parsers are tried in order and the first one
+    matching the whole path wins. Each path component is matched on its
+    own, hence the variables can not span more than one component.
+
+    The states reached by the parsed prefixes are kept in a least
+    recently used cache of *cache_size* entries, so parsing the files
+    of a folder only matches their last component.
+
+    :param parsers: The path components of each template entry.
+    :type parsers: list
+    :param cache_size: The number of parsed prefixes to remember.
+    :type cache_size: int
+
+    '''
+    def __init__(self, parsers, cache_size=CACHE_SIZE):
+        self.parsers = parsers
+        self.cache_size = cache_size
+        self._root = _TrieNode()
+        self._prefixes = OrderedDict()
+
+        for priority, components in enumerate(parsers):
+            node = self._root
+            for component in components:
+                for child in node.children:
+                    if child.component == component:
+                        node = child
+                        break
+                else:
+                    child = _TrieNode(component)
+                    node.children.append(child)
+                    node = child
+
+            if node.priority is None:
+                node.priority = priority
+
+    def _states(self, components):
+        ''' Return the trie nodes reached by *components*, and the
+        variables parsed along each of them.
+        '''
+        # Start from the longest prefix already parsed
+        depth = len(components)
+        states = None
+        while depth:
+            states = self._prefixes.get(components[:depth])
+            if states is not None:
+                # Refresh the prefix in the cache
+                del self._prefixes[components[:depth]]
+                self._prefixes[components[:depth]] = states
+                break
+
+            depth -= 1
+
+        if states is None:
+            states = [(self._root, {})]
+
+        while depth < len(components) and states:
+            component = components[depth]
+            depth += 1
+            next_states = []
+            for node, variables in states:
+                for child in node.children:
+                    match = child.pattern.match(component)
+                    if match is None:
+                        continue
+
+                    child_variables = dict(variables)
+                    for variable, value in match.groupdict().items():
+                        if value is not None or variable not in child_variables:
+                            child_variables[variable] = value
+
+                    next_states.append((child, child_variables))
+
+            states = next_states
+            self._remember(components[:depth], states)
+
+        return states
+
+    def _remember(self, prefix, states):
+        ''' Store the *states* reached by *prefix*, dropping the least
+        recently used prefixes beyond the cache size.
+        '''
+        if self.cache_size <= 0:
+            return
+
+        self._prefixes[prefix] = states
+        while len(self._prefixes) > self.cache_size:
+            self._prefixes.popitem(last=False)
+
+    def match(self, path):
+        ''' Return the variables of the first parser matching *path*.
+
+        :param path: The path, relative to the mount point.
+        :type path: str
+        :returns:  dict -- the parsed variables, None if no parser matched.
+
+        '''
+        found = self.search(path)
+        if found is None:
+            return None
+
+        return found[1]
+
+    def search(self, path):
+        ''' Return the position of the first parser matching *path*,
+        along with the parsed variables.
+
+        :param path: The path, relative to the mount point.
+        :type path: str
+        :returns:  tuple -- the parser position and the parsed variables,
+                   None if no parser matched.
+
+        '''
+        components = tuple(path.split(os.sep))
+        matched = None
+        for node, variables in self._states(components):
+            if node.priority is None:
+                continue
+
+            if matched is None or node.priority < matched[0].priority:
+                matched = (node, variables)
+
+        if matched is None:
+            return None
+
+        logger.debug('Match found for {0} with {1}'.format(
+            path, os.sep.join(self.parsers[matched[0].priority])
+        ))
+        return matched[0].priority, dict(matched[1])
+
+    def clear(self):
+        ''' Forget all the parsed prefixes.
+        '''
+        self._prefixes.clear()
@@ -0,0 +1,77 @@
+'''
+Directory scanning
+
+Provide a :func:`scandir` function, using the native implementation when
+available (python 3.5+ or the scandir package), or falling back to an
+equivalent based on :func:`os.listdir` which stats each entry only once.
+
+'''
+import os
+import stat
+
+try:
+    from os import scandir as _native_scandir
+except ImportError:
+    try:
+        from scandir import scandir as _native_scandir
+    except ImportError:
+        _native_scandir = None
+
+try:
+    import efesto_logger as logging
+except:
+    import logging
+
+logger = logging.getLogger(__name__)
+
+
+class DirEntry(object):
+    ''' Fallback of :class:`os.DirEntry`, caching the stat of the entry.
+
+    :param root: The scanned directory.
+    :type root: str
+    :param name: The entry name.
+    :type name: str
+
+    '''
+    __slots__ = ('name', 'path', '_stat')
+
+    def __init__(self, root, name):
+        self.name = name
+        self.path = os.path.join(root, name)
+        self._stat = None
+
+    def stat(self):
+        if self._stat is None:
+            self._stat = os.stat(self.path)
+
+        return self._stat
+
+    def is_dir(self):
+        try:
+            return stat.S_ISDIR(self.stat().st_mode)
+        except OSError:
+            return False
+
+    def is_file(self):
+        try:
+            return stat.S_ISREG(self.stat().st_mode)
+        except OSError:
+            return False
+
+    def __repr__(self):
+        return '<{0} {1!r}>'.format(self.__class__.__name__, self.name)
+
+
+def scandir(path):
+    ''' Return the entries of the directory *path*.
+
+    :param path: The directory to scan.
+    :type path: str
+    :returns:  list -- the directory entries.
+
+    '''
+    if _native_scandir is not None:
+        return list(_native_scandir(path))
+
+    return [DirEntry(path, name) for name in os.listdir(path)]
@@ -10,6 +10,19 @@ import re
 import stat
 import copy
 from operator import itemgetter
+from multiprocessing.pool import ThreadPool
+
+from ade.manager.artifact import TemplateArtifact
+from ade.manager.content import TemplateContent, content_store
+from ade.manager.exceptions import ConfigError, TemplateError
+from ade.manager.index import PathIndex, sanitize_filter
+from ade.manager.node import (
+    TemplateNode, ResolvedEntry, NodeMapping, mapping_equal
+)
+from ade.manager.scan import scandir
+from ade.manager.cache import (
+    RegisterCache, directory_stamp, changed_directories
+)
 
 try:
     import efesto_logger as logging
@@ -19,16 +32,206 @@ except:
 logger = logging.getLogger(__name__)
 
 
+def _sort_key(item):
+    ''' Return the sorting key of a template entry, folders first.
+    '''
+    name = item.get('name').replace('@', '').replace('+', '')
+    return (not item.get('folder'), name.lower())
+
+
+def _register_sort_key(item):
+    ''' Return the sorting key of a registered template.
+    '''
+    return item.get('name').replace('@', '').replace('+', '').lower()
+
+
+def _search_paths(search_path):
+    ''' Return the list of paths of the given template *search_path*.
+
+    :param search_path: A list of paths, or paths separated by os.pathsep.
+    :type search_path: str or list
+    :returns:  list -- the template paths.
+
+    '''
+    if isinstance(search_path, basestring):
+        search_path = search_path.split(os.pathsep)
+
+    return [path for path in search_path if path]
+
+
+def merge_templates(layers):
+    ''' Merge the given template *layers*, the first one taking precedence.
+
+    Folders are merged recursively, by name, while any other
+    entry of the first layer overrides the ones of the others.
+
+    :param layers: The templates to merge, with the same name.
+    :type layers: list
+    :returns:  TemplateNode -- the merged template.
+
+    '''
+    top = layers[0]
+    layers = [layer for layer in layers if layer.folder]
+    if not top.folder or len(layers) == 1:
+        return top
+
+    groups = {}
+    for layer in layers:
+        for child in layer.children or ():
+            groups.setdefault(child.name, []).append(child)
+
+    children = [merge_templates(group) for group in groups.values()]
+    children.sort(key=_sort_key)
+    return TemplateNode(
+        top.name, top.permission, top.folder, children=tuple(children)
+    )
+
+
+def _sort_template(item):
+    ''' Recursively sort in place the children of a registered template.
+    '''
+    if item.children:
+        item.children = tuple(sorted(item.children, key=_sort_key))
+        for child in item.children:
+            _sort_template(child)
+
+
+def _iter_entries(schema):
+    ''' Walk the given *schema* and yield its entries depth first.
+    '''
+    root = ResolvedEntry(schema)
+    yield root
+
+    # Each level of the stack holds an entry and its pending children
+    stack = [(root, iter(schema.get('children', ())))]
+    while stack:
+        parent, children = stack[-1]
+        for child in children:
+            entry = ResolvedEntry(child, parent)
+            yield entry
+            stack.append((entry, iter(child.get('children', ()))))
+            break
+        else:
+            stack.pop()
+
+
+class TemplateView(dict):
+    ''' Copy on write view of a resolved template entry.
+
+    The view owns its own keys, while the children are turned into
+    views only once they get accessed, leaving the shared
+    resolved template untouched.
+
+    :param template: The resolved template to wrap.
+    :type template: TemplateNode
+
+    '''
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if key == 'children' and isinstance(value, tuple):
+            value = [TemplateView(child) for child in value]
+            dict.__setitem__(self, key, value)
+
+        return value
+
+    def get(self, key, default=None):
+        if key not in self:
+            return default
+
+        return self[key]
+
+    def pop(self, key, *default):
+        if key in self:
+            self[key]
+
+        return dict.pop(self, key, *default)
+
+    def __eq__(self, other):
+        if not isinstance(other, (dict, NodeMapping)):
+            return NotImplemented
+
+        return mapping_equal(dict.items(self), other)
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+
+        return not result
+
+
+class CompiledTemplate(object):
+    ''' A resolved template, along with its flattened entries.
+
+    Iterating a compiled template yields its resolved entries depth first,
+    the entries are flattened on first use and then shared.
+
+    :param name: The template name.
+    :type name: str
+    :param template: The resolved template.
+    :type template: TemplateNode
+
+    '''
+    __slots__ = ('name', 'template', '_entries', '_path_index')
+
+    def __init__(self, name, template):
+        self.name = name
+        self.template = template
+        self._entries = None
+        self._path_index = None
+
+    @property
+    def entries(self):
+        ''' The resolved entries of the template, as ResolvedEntry.
+        '''
+        if self._entries is None:
+            self._entries = tuple(_iter_entries(self.template))
+
+        return self._entries
+
+    @property
+    def path_index(self):
+        ''' The index of the template paths, built on first use.
+        '''
+        if self._path_index is None:
+            self._path_index = PathIndex(self.entries)
+
+        return self._path_index
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+
 class TemplateManager(object):
     ''' Template manager class,
     Provide standard methods to create virtual file structure
     from disk fragments.
 
-    :param template_folder: The path to the config folder.
-    :type template_folder: str
+    The ``template_search_path`` of the config can be a list of paths,
+    or a string of paths separated by :data:`os.pathsep`. Templates with
+    the same name are merged, the first path taking precedence.
+
+    When the config sets a ``template_artifact_path``, the templates are
+    loaded from the artifact, see :meth:`load_artifact`, and the
+    ``template_search_path`` becomes optional.
+
+    With *lazy* set, no template is registered upfront: each template is
+    scanned on its first lookup, so only the templates reachable from
+    the resolved ones are registered. When the config sets a
+    ``template_cache_path``, the templates of the template paths whose
+    cache is valid are registered upfront from it instead, which is
+    cheaper than scanning them on demand.
+
+    :param config: The config of the project.
+    :type config: dict
+    :param lazy: Register the templates on demand.
+    :type lazy: bool
 
     '''
-    def __init__(self, config=None):
+    def __init__(self, config=None, lazy=False):
         ''' Initialization function.
 
         '''
@@ -37,45 +240,197 @@ class TemplateManager(object):
         self.__variable_indicator = '+'
 
         self._register = []
-        template_folder = config.get('template_search_path')
-        self._template_folder = os.path.realpath(template_folder)
-        logger.debug(
-            'Using template path: {0}'.format(self._template_folder)
-        )
-        self.register_templates()
+        self._register_index = {}
+        self._merged_cache = {}
+        self._resolved_cache = {}
+        self._compiled_cache = {}
+        self._generation = 0
+        self._directory_stamps = {}
+        self._template_roots = []
+        self._template_paths = {}
+        self._lazy_roots = set()
+
+        self._scan_workers = int(config.get('template_scan_workers', 1))
+
+        self._register_cache = None
+        cache_folder = config.get('template_cache_path')
+        if cache_folder:
+            logger.debug('Using template cache: {0}'.format(cache_folder))
+            self._register_cache = RegisterCache(cache_folder)
+
+        self._lazy = lazy
+        self._missing_templates = set()
+
+        self.artifact = None
+        artifact_path = config.get('template_artifact_path')
+        if artifact_path and os.path.exists(artifact_path):
+            try:
+                self.load_artifact(TemplateArtifact.load(artifact_path))
+            except TemplateError as error:
+                logger.warning(error)
+
+        # The search path is only needed when no artifact got loaded
+        self._template_folders = [
+            os.path.realpath(template_folder) for template_folder
+            in _search_paths(config.get('template_search_path') or [])
+        ]
+        self._template_folder = None
+        if self._template_folders:
+            self._template_folder = self._template_folders[0]
+            logger.debug(
+                'Using template paths: {0}'.format(self._template_folders)
+            )
+        elif self.artifact is None:
+            raise ConfigError(
+                'No template_search_path set, nor a template_artifact_path '
+                'to load the templates from'
+            )
 
-        def sanitize(var):
-            if not var:
-                return None
+        if self.artifact is None:
+            if lazy:
+                self._register_lazy()
+            else:
+                self.register_templates()
 
-            if '@' in var:
-                var = var.replace('@', '')
+    @property
+    def register(self):
+        ''' Return the templates registered, one per name.
 
-            if '+' in var:
-                var = var.replace('+', '')
+        Templates are read only dictionaries, whose file contents are
+        read on access, use :meth:`~ade.manager.node.NodeMapping.to_dict`
+        to get plain dictionaries, eg: to be json encoded.
 
-            return var
+        '''
+        return list(self._iter_register())
 
-        def sort_children(reg_item):
-            if len(reg_item.get('children', [])):
-                sorted_children = sorted(
-                    reg_item.get('children', []),
-                    key= lambda x : (not(x.get('folder')), sanitize(x.get('name')).lower()))
+    @property
+    def template_names(self):
+        ''' Return the names of the templates registered.
+        '''
+        return [template['name'] for template in self._iter_register()]
 
-                reg_item['children'] = sorted_children
-                for child in reg_item['children']:
-                    sort_children(child)
+    def _iter_register(self):
+        ''' Yield the templates registered, one per name.
+        '''
+        for template in self._register:
+            layers = self._register_index[template['name']]
+            if template is layers[0]:
+                yield self.get_template(template['name'])
 
-        for reg_item in self._register:
-            sort_children(reg_item)
+    @property
+    def generation(self):
+        ''' Counter increased on each change of the register,
+        or of the resolved templates.
+        '''
+        return self._generation
 
-        self._register = sorted(self._register, key= lambda x : (sanitize(x.get('name')).lower()))
+    def has_template(self, name):
+        ''' Return whether the template *name* is registered.
+
+        :param name: The template *name*.
+        :type name: str
+        :returns:  bool -- True if the template is in register.
+
+        '''
+        if name not in self._register_index and self._lazy:
+            self._load_template(name)
+
+        return name in self._register_index
+
+    def get_template(self, name):
+        ''' Return the registered template *name*, without copying it.
+
+        When the template is found in more than one template path, the
+        found templates are merged on first lookup, see
+        :func:`merge_templates`.
+
+        :param name: The template *name*.
+        :type name: str
+        :returns:  dict -- the registered template.
+        :raises: KeyError
+
+        .. note::
+            The returned template is the one held by the register,
+            use :meth:`resolve_template` to get a resolved copy.
+
+        '''
+        layers = self._register_index.get(name)
+        if not layers and self._lazy:
+            layers = self._load_template(name)
+
+        if not layers:
+            msg = 'template %s not found in register' % name
+            logger.error(msg)
+            raise KeyError(msg)
+
+        if len(layers) == 1:
+            return layers[0]
+
+        merged = self._merged_cache.get(name)
+        if merged is None:
+            merged = self._merged_cache[name] = merge_templates(layers)
+
+        return merged
+
+    def _load_template(self, name):
+        ''' Scan and register the template *name* from each template path.
+
+        :param name: The template *name*.
+        :type name: str
+        :returns:  list -- the registered templates, one per template path.
 
-    @property
-    def register(self):
-        ''' Return the templates registered.
         '''
-        return self._register
+        if name in self._missing_templates or os.sep in name:
+            return []
+
+        for root in self._template_roots:
+            template_path = os.path.join(root, name)
+            if (
+                template_path in self._template_paths or
+                not os.path.exists(template_path)
+            ):
+                continue
+
+            logger.debug('Registering template: {0}'.format(template_path))
+            template = self._scan_template(
+                template_path, self._directory_stamps
+            )
+            _sort_template(template)
+            self._template_paths[template_path] = template
+
+        self._rebuild_register()
+        layers = self._register_index.get(name, [])
+        if not layers:
+            self._missing_templates.add(name)
+
+        return layers
+
+    def _rebuild_register(self):
+        ''' Rebuild the register and its name index from the templates
+        registered from each template path.
+
+        Templates with the same name are indexed following the order
+        of their template paths, the first one taking precedence.
+
+        '''
+        priority = dict(
+            (root, index) for index, root in enumerate(self._template_roots)
+        )
+        templates = sorted(
+            self._template_paths.items(),
+            key=lambda item: priority[os.path.dirname(item[0])]
+        )
+
+        # Stable sort, the order of the template paths is kept by name
+        self._register = [template for path, template in templates]
+        self._register.sort(key=_register_sort_key)
+        self._register_index = {}
+        for template in self._register:
+            self._register_index.setdefault(template['name'], []).append(
+                template
+            )
+
+        self._generation += 1
 
     def find_path(self, startwith=None, contains=None, endswith=None, template_name='@+show+@'):
         ''' Finds a path based on some filtering arguments.
@@ -91,27 +446,76 @@ class TemplateManager(object):
         :return: the first matched path
         :rtype: ``list``
         '''
+        index = self.compile_template(template_name).path_index
+        return self._find_path(index, startwith, contains, endswith)
 
-        def sanitize(var):
-            if not var:
-                return None
+    def find_paths(self, startwith=None, contains=None, endswith=None, template_name='@+show+@', order='depth'):
+        ''' Finds all the paths matching some filtering arguments.
 
-            if '+' in var:
-                var = var.replace('+', '')
+        Paths are found lazily, using the index of the compiled template.
 
-            if '{' in var:
-                var = var[1:-1]
+        :param startwith: filters out paths that do not start with this element
+        :type startwith: string
+        :param contains: filters out paths that do not contain what in this list
+        :type contains: list
+        :param endswith: filters out paths that do not end with this element
+        :type endswith: string
+        :param template_name: where to start resolving the template from
+        :type template_name: string
+        :param order: the order of the paths, one of traversal, depth
+                      (shallowest first) or lexical
+        :type order: string
+        :return: the matched paths
+        :rtype: ``generator``
+
+        .. code-block:: python
 
-            return var
+            for path in manager.find_paths(contains=['scenes']):
+                print path
+        '''
+        index = self.compile_template(template_name).path_index
+        startwith = sanitize_filter(startwith) or None
+        endswith = sanitize_filter(endswith) or None
+        contains = map(sanitize_filter, contains or []) or []
 
-        built = self.resolve_template(template_name)
-        resolved = self.resolve(built)
-        paths = [item['path'] for item in resolved]
-        # paths = sorted(paths, key= lambda x : [len(y) for y in x])
+        positions = index.iter_find(startwith, contains, endswith, order)
+        for position in positions:
+            yield index.entries[position].path
 
-        startwith = sanitize(startwith) or None
-        endswith = sanitize(endswith) or None
-        contains = map(sanitize, contains or []) or []
+    def find_path_batch(self, filters, template_name='@+show+@'):
+        ''' Finds a path for each of the given set of filtering arguments.
+
+        :param filters: the filtering arguments of each query, as accepted
+                        by :meth:`find_path`
+        :type filters: list of dict
+        :param template_name: where to start resolving the template from
+        :type template_name: string
+        :return: the first matched path of each query
+        :rtype: ``list``
+
+        .. code-block:: python
+
+            paths = manager.find_path_batch([
+                dict(endswith='scenes', contains=['maya']),
+                dict(endswith='scripts', contains=['nuke'])
+            ])
+        '''
+        index = self.compile_template(template_name).path_index
+        return [
+            self._find_path(
+                index,
+                query.get('startwith'),
+                query.get('contains'),
+                query.get('endswith')
+            ) for query in filters
+        ]
+
+    def _find_path(self, index, startwith, contains, endswith):
+        ''' Return the first path of *index* matching the filters.
+        '''
+        startwith = sanitize_filter(startwith) or None
+        endswith = sanitize_filter(endswith) or None
+        contains = map(sanitize_filter, contains or []) or []
 
         logger.debug(
             '\n---------------------------\n'
@@ -123,32 +527,8 @@ class TemplateManager(object):
             % (startwith, contains, endswith)
         )
 
-        for path in paths:
-            logger.debug('Filtering against path %s' % path)
-
-            sanitized_last_path_item = sanitize(path[-1])
-            sanitized_first_path_item = sanitize(path[0])
-
-            _start = startwith == sanitized_first_path_item if startwith else True
-            _ends = endswith == sanitized_last_path_item if endswith else True
-
-            outs = []
-            for item_in_contains in contains:
-                is_in = False
-
-                for path_element in path:
-                    if item_in_contains in path_element:
-                        is_in = True
-                        outs.append(is_in)
-                if is_in == False:
-                    outs.append(is_in)
-
-
-            _contains = all(outs)
-
-            if all([_start, _ends, _contains]):
-                return path
-        else:
+        path = index.find_path(startwith, contains, endswith)
+        if path is None:
             logger.debug(
                 'Could not find a path that matches the criteria:\n'
                 'Starts with: %s\n'
@@ -157,12 +537,18 @@ class TemplateManager(object):
                 % (startwith, contains, endswith)
             )
 
+        return path
+
     def resolve(self, schema):
         ''' Resolve the given *schema* data and return all the entries.
 
+        Entries are read only dictionaries, use
+        :meth:`~ade.manager.node.NodeMapping.to_dict` to get plain
+        dictionaries, eg: to be json encoded.
+
             :param schema: The schema to resolve.
             :type schema: dict
-            :returns:  list -- the resolved paths.
+            :returns:  list -- the resolved entries, as ResolvedEntry.
             :raises: AttributeError, KeyError
 
             .. code-block:: python
@@ -174,64 +560,35 @@ class TemplateManager(object):
                 resolved_schema = manager.resolve_template(schema)
 
         '''
-        root_name = schema.get('name').replace(self.__reference_indicator, '')
-        root = dict(
-            path=[root_name],
-            permission=schema.get('permission', 777),
-            folder=schema.get('folder', True),
-            content=schema.get('content', '')
-        )
-
-        paths = [root_name]
+        return list(self.iter_resolve(schema))
 
-        result_paths = []
-        self._resolve(
-            schema,
-            result_paths,
-            paths
-        )
-
-        #paths = sorted(paths, key= lambda x : [len(y) for y in x])
-        #result_paths.reverse()
-        result_paths.insert(0,root)
+    def iter_resolve(self, schema):
+        ''' Resolve the given *schema* data and yield the entries
+        depth first, as they get resolved.
 
-        #paths.sort(key=lambda x: len(x['path']))
-        return result_paths
+            :param schema: The schema to resolve.
+            :type schema: dict
+            :returns:  generator -- the resolved entries, as ResolvedEntry.
+            :raises: AttributeError, KeyError
 
-    def _resolve(self, schema, final_path_list, path=None):
-        ''' Recursively build the final_path_list from schema.
+            .. code-block:: python
 
-        :param schema: The *schema* informations
-        :type name: str
-        :param final_path_list: The resolved list of paths
-        :type name: list
-        :param path: An internal memory reference for the recursive function.
-        :type name: list
+                from ade.schema.template import TemplateManager
 
-        .. note::
-            This function is meant to be called only from within
-            the resolve function
+                manager = TemplateManager('./templates')
+                schema = manager.resolve_template('@+show+@')
+                for entry in manager.iter_resolve(schema):
+                    print entry['path']
 
         '''
-        for index, entry in enumerate(schema.get('children', [])):
-            name = entry.get('name')
-            name = name.replace(self.__reference_indicator, '')
-            path.append(name)
-            current_path = path[:]
-
-            new_entry = dict(
-                path=current_path,
-                permission=entry.get('permission', 777),
-                folder=entry.get('folder', True),
-                content=entry.get('content', '')
-            )
-
-            final_path_list.append(
-                new_entry
-            )
-            self._resolve(entry, final_path_list, path)
+        compiled = self._compiled_cache.get(schema.get('name'))
+        if compiled is not None and compiled.template is schema:
+            entries = compiled.entries
+        else:
+            entries = _iter_entries(schema)
 
-            path.pop()
+        for entry in entries:
+            yield entry
 
     def _get_in_register(self, name):
         ''' Return a copy of the given schema name in register.
@@ -251,27 +608,20 @@ class TemplateManager(object):
                 schema = manager._get_in_register('@+show+@')
 
         '''
-        msg = 'template %s not found in register'
-
-        for item in self.register:
-            if not item.get('name') == name:
-                # logger.debug((msg % name) + '... keep looking')
-                continue
+        return copy.deepcopy(self.get_template(name))
 
-            #logger.debug('found template %s ' % name)
-            item = copy.deepcopy(item)
-            return item
-
-        logger.error(msg % name)
-        raise KeyError(msg % name)
-
-    def resolve_template(self, name):
+    def resolve_template(self, name, mutable=False):
         ''' Return the built schema fragment of the given variable *name*.
 
+            Resolved templates are cached until the register changes,
+            and shared between callers, hence they are read only.
+
             :param name: The template *name*.
             :type name: str
+            :param mutable: Return a copy on write view of the template.
+            :type mutable: bool
             :returns:  dict -- the resolved template.
-            :raises: AttributeError, KeyError
+            :raises: AttributeError, KeyError, TemplateError
 
             .. code-block:: python
 
@@ -283,60 +633,197 @@ class TemplateManager(object):
                 schema = manager.resolve_template('@+show+@')
 
         '''
-        root = self._get_in_register(name)
-        self._resolve_template(
-            root,
-        )
+        resolved = self.compile_template(name).template
+        if mutable:
+            return TemplateView(resolved)
+
+        return resolved
+
+    def compile_template(self, name):
+        ''' Return the compiled template *name*, compiling it on first use.
+
+        Compiling flattens all the references of the template, so
+        resolving the compiled template is linear in its entries.
+
+            :param name: The template *name*.
+            :type name: str
+            :returns:  CompiledTemplate -- the compiled template.
+            :raises: KeyError, TemplateError
 
-        def sanitize(var):
-            if not var:
-                return None
+            .. code-block:: python
+
+                from ade.schema.template import TemplateManager
 
-            if '@' in var:
-                var = var.replace('@', '')
+                manager = TemplateManager(config)
+                compiled = manager.compile_template('@+show+@')
+                paths = [entry['path'] for entry in compiled]
 
-            if '+' in var:
-                var = var.replace('+', '')
+        '''
+        compiled = self._compiled_cache.get(name)
+        if compiled is None:
+            compiled = CompiledTemplate(name, self._resolve_fragment(name))
+            self._compiled_cache[name] = compiled
 
-            return var
+        return compiled
 
-        def sort_children(chunk):
-            if len(chunk.get('children', [])) > 0:
-                sorted_children = sorted(chunk.get('children', []), key= lambda x : (not(x.get('folder')), sanitize(x.get('name')).lower()))
-                chunk['children'] = sorted_children
-                for child in chunk['children']:
-                    sort_children(child)
+    def invalidate_cache(self):
+        ''' Drop all the cached merged, resolved and compiled templates.
+        '''
+        self._merged_cache.clear()
+        self._resolved_cache.clear()
+        self._compiled_cache.clear()
+        self._generation += 1
 
-        sort_children(root)
+    def _resolve_fragment(self, name):
+        ''' Return the resolved template *name*, resolving it on first use.
 
-        return root
+        :param name: The template *name*.
+        :type name: str
+        :returns:  TemplateNode -- the resolved template.
+        :raises: KeyError, TemplateError
 
-    def _resolve_template(self, schema):
-        ''' Recursively resolve in place the given *schema* schema.
+        '''
+        resolved = self._resolved_cache.get(name)
+        if resolved is None:
+            template = self.get_template(name)
+            resolved = self._resolve_template(
+                template, template.get('children', ()), name
+            )
 
-        :param name: The *schema* template to be resolved.
-        :type name: dict
+        return resolved
+
+    def _resolve_template(self, schema, children, name=None):
+        ''' Iteratively build a resolved copy of *schema* with *children*.
+
+        Only the nodes are copied, contents are shared with the register,
+        and fragments referenced without extra children are resolved once
+        and shared through the cache.
+
+        :param schema: The *schema* template to be resolved.
+        :type schema: dict
+        :param children: The children of *schema*.
+        :type children: tuple
+        :param name: The name of the fragment *schema* is registered as.
+        :type name: str
+        :returns:  TemplateNode -- the resolved template.
+        :raises: KeyError, TemplateError
 
         .. note::
             This function is meant to be called only from within
             the resolve_template function.
 
         '''
+        # Each frame holds the schema being resolved, its pending and
+        # resolved children, and whether the result can be cached.
+        # The fragment names being expanded are tracked along the frames.
+        stack = [(schema, iter(children), [], name is not None)]
+        expanding = [name]
+
+        while True:
+            schema, pending, resolved_children, cacheable = stack[-1]
+            entry = next(pending, None)
+
+            if entry is None:
+                # All the children are resolved, close the frame
+                stack.pop()
+                fragment = expanding.pop()
+                resolved_children.sort(key=_sort_key)
+                node = TemplateNode(
+                    schema['name'], schema['permission'], schema['folder'],
+                    children=tuple(resolved_children),
+                    content=schema.get('content')
+                )
+                if cacheable:
+                    self._resolved_cache[fragment] = node
 
+                if not stack:
+                    return node
+
+                stack[-1][2].append(node)
+                continue
 
-        for index, entry in enumerate(schema.get('children', [])):
             item = entry.get('name', '')
-            #logger.debug('resolving item %s' % item)
-            if self.__reference_indicator in item:
-                removed = schema['children'].pop(index)
-                fragment = self._get_in_register(removed['name'])
-                if removed.get('children'):
-                    fragment['children'].extend(removed['children'])
-
-                schema['children'].insert(index, fragment)
-                self._resolve_template(fragment)
-            else:
-                self._resolve_template(entry)
+            extra_children = entry.get('children')
+
+            if self.__reference_indicator not in item:
+                if extra_children is None:
+                    resolved_children.append(TemplateNode(
+                        item, entry['permission'], entry['folder'],
+                        content=entry.get('content')
+                    ))
+                else:
+                    stack.append((entry, iter(extra_children), [], False))
+                    expanding.append(None)
+
+                continue
+
+            if item in expanding:
+                chain = [fragment for fragment in expanding if fragment]
+                chain = chain[chain.index(item):] + [item]
+                msg = 'cyclic template reference: {0}'.format(
+                    ' -> '.join(chain)
+                )
+                logger.error(msg)
+                raise TemplateError(msg)
+
+            if not extra_children and item in self._resolved_cache:
+                resolved_children.append(self._resolved_cache[item])
+                continue
+
+            # Fragments merged with extra children are specific
+            # to this entry, hence they are not cached
+            fragment_template = self.get_template(item)
+            fragment_children = tuple(fragment_template.get('children', ()))
+            if extra_children:
+                fragment_children += tuple(extra_children)
+
+            stack.append((
+                fragment_template,
+                iter(fragment_children),
+                [],
+                not extra_children
+            ))
+            expanding.append(item)
+
+    def load_artifact(self, artifact):
+        ''' Replace the register with the templates of *artifact*.
+
+        The compiled templates of the artifact are used as they are,
+        neither the template paths nor the templates get scanned.
+        Use :meth:`register_templates` to register again the templates
+        from the template paths. The contents of the artifact replaced,
+        if any, are released, see
+        :meth:`~ade.manager.artifact.TemplateArtifact.release`.
+
+            :param artifact: The compiled template set.
+            :type artifact: TemplateArtifact
+
+            .. code-block:: python
+
+                from ade.manager.artifact import TemplateArtifact
+
+                manager = TemplateManager(config)
+                manager.load_artifact(TemplateArtifact.load('templates.ade'))
+                schema = manager.resolve_template('@+show+@')
+
+        '''
+        if self.artifact is not None and self.artifact is not artifact:
+            self.artifact.release()
+
+        self.artifact = artifact
+        self._lazy = False
+        self._template_paths = {}
+        self._directory_stamps = {}
+
+        self._register = sorted(artifact.templates, key=_register_sort_key)
+        self._register_index = dict(
+            (template['name'], [template]) for template in self._register
+        )
+
+        self.invalidate_cache()
+        for name, template in artifact.compiled.items():
+            self._resolved_cache[name] = template
+            self._compiled_cache[name] = CompiledTemplate(name, template)
 
     def register_templates(self, template_folder=None):
         ''' Parse template path and fill up the register table.
@@ -351,77 +838,374 @@ class TemplateManager(object):
                 manager = TemplateManager()
                 manager.register_templates('some/path/to/template')
         '''
-        template_folder = template_folder or self._template_folder
-        template_path = os.path.realpath(template_folder)
-        templates = os.listdir(template_path)
+        if template_folder:
+            template_folders = [template_folder]
+        else:
+            template_folders = self._template_folders
+
+        if self.artifact is not None:
+            self.artifact.release()
+            self.artifact = None
+
+        for template_folder in template_folders:
+            self._register_folder(os.path.realpath(template_folder))
+
+        self._rebuild_register()
+        self.invalidate_cache()
+
+    def _register_lazy(self):
+        ''' Add the template paths, whose templates get registered on
+        their first lookup.
+
+        The templates of the template paths whose cache is valid are
+        registered upfront, the other template paths are left to be
+        scanned on demand.
+
+        '''
+        for template_path in self._template_folders:
+            self._template_roots.append(template_path)
+            cached = None
+            if self._register_cache:
+                cached = self._register_cache.load(template_path)
+
+            if cached:
+                self._add_templates(template_path, *cached)
+            else:
+                self._lazy_roots.add(template_path)
+
+        self._rebuild_register()
+
+    def _add_templates(self, template_path, templates, stamps):
+        ''' Register the *templates* scanned from *template_path*,
+        along with the *stamps* of their directories.
+        '''
+        self._lazy_roots.discard(template_path)
+        self._directory_stamps.update(stamps)
+        for template in templates:
+            path = os.path.join(template_path, template['name'])
+            self._template_paths[path] = template
+
+    def _register_folder(self, template_path):
+        ''' Register the templates of the given *template_path*.
+
+        Template paths registered for the first time take precedence
+        over none of the previous ones, registering a template path
+        again replaces its templates.
+
+        :param template_path: The template path.
+        :type template_path: str
+
+        '''
+        removed = set()
+        if template_path in self._template_roots:
+            for path in list(self._template_paths):
+                if os.path.dirname(path) == template_path:
+                    del self._template_paths[path]
+                    removed.add(path)
+        else:
+            self._template_roots.append(template_path)
+
+        cached = None
+        if self._register_cache:
+            cached = self._register_cache.load(template_path)
+
+        if cached:
+            templates, stamps = cached
+        else:
+            templates, stamps = self._scan_templates(template_path)
+            for template in templates:
+                _sort_template(template)
+
+            if self._register_cache:
+                self._register_cache.save(template_path, templates, stamps)
+
+        self._add_templates(template_path, templates, stamps)
+        removed.difference_update(self._template_paths)
+
+        # Release the contents of the templates gone since the last scan
+        for path in removed:
+            content_store.forget(path)
+
+    def _scan_templates(self, template_path):
+        ''' Walk the given *template_path* and return its templates.
+
+        Templates are walked concurrently when the config sets more
+        than one ``template_scan_workers``.
+
+        :param template_path: The template path.
+        :type template_path: str
+        :returns:  tuple -- the templates and the stamps of the
+                   scanned directories.
+
+        '''
+        stamps = {template_path: directory_stamp(os.stat(template_path))}
+        entries = scandir(template_path)
+
+        def scan(entry):
+            template_stamps = {}
+            template = self._scan_template(
+                entry.path, template_stamps, entry.stat()
+            )
+            return template, template_stamps
 
         # For each template root, recursively walk the content,
         # and register the hierarcy path in form of dictionary
-        for template in templates:
-            current_template_path = os.path.join(template_path, template)
-            permission = oct(stat.S_IMODE(
-                os.stat(current_template_path).st_mode
-            ))
+        if self._scan_workers > 1 and len(entries) > 1:
+            pool = ThreadPool(min(self._scan_workers, len(entries)))
+            try:
+                results = pool.map(scan, entries)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            results = [scan(entry) for entry in entries]
+
+        templates = []
+        for template, template_stamps in results:
+            templates.append(template)
+            stamps.update(template_stamps)
+
+        return templates, stamps
+
+    def _scan_template(self, template_path, stamps, stats=None):
+        ''' Walk the given *template_path* and return its template.
+
+        :param template_path: The path of a single template.
+        :type template_path: str
+        :param stamps: The stamps of the scanned directories to fill up.
+        :type stamps: dict
+        :param stats: The stat of *template_path*, if already known.
+        :type stats: posix.stat_result
+        :returns:  dict -- the template.
+
+        '''
+        stats = stats or os.stat(template_path)
+        permission = oct(stat.S_IMODE(stats.st_mode))
+
+        children = []
+        if stat.S_ISDIR(stats.st_mode):
+            stamps[template_path] = directory_stamp(stats)
+            self._register_templates(template_path, children, stamps)
+
+        return TemplateNode(
+            os.path.basename(template_path),
+            permission,
+            children=tuple(children)
+        )
+
+    def refresh(self, changed=None):
+        ''' Re-register only the templates changed on disk.
+
+        Changes are detected polling the stamps of the scanned directories,
+        unless the *changed* paths are given, eg: from a file system
+        watcher. Only the resolved templates depending on the refreshed
+        ones are dropped from the cache.
 
-            current_template_map = dict(
-                name=template,
-                children=[],
-                permission=permission,
-                folder=True
+            :param changed: The changed paths, defaults to the polled ones.
+            :type changed: list
+            :returns:  list -- the names of the refreshed templates.
+
+            .. code-block:: python
+
+                from ade.schema.template import TemplateManager
+
+                manager = TemplateManager(config)
+                ...
+                manager.refresh()
+        '''
+        if changed is None:
+            changed = changed_directories(self._directory_stamps)
+
+        # Templates missing so far might have been added
+        self._missing_templates.clear()
+
+        # Find out which template roots and single templates were touched
+        touched_roots = set()
+        touched_templates = set()
+        for path in changed:
+            path = os.path.realpath(path)
+            for root in self._template_roots:
+                if path == root:
+                    touched_roots.add(root)
+                    break
+
+                if path.startswith(root + os.sep):
+                    relative = path[len(root) + len(os.sep):]
+                    name = relative.split(os.sep)[0]
+                    touched_templates.add(os.path.join(root, name))
+                    break
+
+        # Templates added or removed from the roots
+        for root in touched_roots:
+            known = set(
+                path for path in self._template_paths
+                if os.path.dirname(path) == root
+            )
+            current = set(
+                os.path.join(root, name) for name in os.listdir(root)
             )
+            touched_templates.update(known.symmetric_difference(current))
+            self._directory_stamps[root] = directory_stamp(os.stat(root))
+
+        refreshed = set()
+        for template_path in sorted(touched_templates):
+            refreshed.add(os.path.basename(template_path))
+            self._refresh_template(template_path)
+
+        if not refreshed:
+            return []
 
-            self._register_templates(
-                current_template_path,
-                current_template_map['children']
+        logger.debug('Refreshed templates: {0}'.format(sorted(refreshed)))
+        self._rebuild_register()
+        self._invalidate_dependents(refreshed)
+
+        if self._register_cache:
+            roots = touched_roots.union(
+                os.path.dirname(path) for path in touched_templates
+            )
+            # Templates registered on demand leave their root partial
+            for root in roots.difference(self._lazy_roots):
+                self._save_register_cache(root)
+
+        return sorted(refreshed)
+
+    def _refresh_template(self, template_path):
+        ''' Scan again the template in *template_path* and replace it.
+
+        :param template_path: The path of a single template.
+        :type template_path: str
+
+        '''
+        # Drop the stamps and the contents of the previous scan
+        content_store.forget(template_path)
+        for path in list(self._directory_stamps):
+            if path == template_path or path.startswith(
+                template_path + os.sep
+            ):
+                del self._directory_stamps[path]
+
+        self._template_paths.pop(template_path, None)
+        if os.path.exists(template_path):
+            template = self._scan_template(
+                template_path, self._directory_stamps
             )
+            _sort_template(template)
+            self._template_paths[template_path] = template
+
+    def _references(self, template):
+        ''' Return the names of the templates referenced by *template*.
+
+        :param template: The registered template.
+        :type template: dict
+        :returns:  set -- the referenced template names.
+
+        '''
+        references = set()
+        entries = list(template.get('children', []))
+        while entries:
+            entry = entries.pop()
+            if self.__reference_indicator in entry.get('name', ''):
+                references.add(entry['name'])
+
+            entries.extend(entry.get('children', []))
+
+        return references
+
+    def _invalidate_dependents(self, names):
+        ''' Drop the resolved templates depending on any of the *names*.
+
+        :param names: The changed template names.
+        :type names: set
+
+        '''
+        dependents = set(names)
+        references = {}
+        for item in self._register:
+            references.setdefault(item['name'], set()).update(
+                self._references(item)
+            )
+
+        # Walk the references backward, until no more dependents are found
+        found = True
+        while found:
+            found = False
+            for name, referenced in references.items():
+                if name not in dependents and referenced & dependents:
+                    dependents.add(name)
+                    found = True
 
-            self._register.append(current_template_map)
+        for name in names:
+            self._merged_cache.pop(name, None)
 
-    def _register_templates(self, root, mapped):
+        for name in dependents:
+            self._resolved_cache.pop(name, None)
+            self._compiled_cache.pop(name, None)
+
+        self._generation += 1
+
+    def _save_register_cache(self, template_path):
+        ''' Store the currently registered templates of *template_path*.
+
+        :param template_path: The template path.
+        :type template_path: str
+
+        '''
+        templates = [
+            template for path, template in self._template_paths.items()
+            if os.path.dirname(path) == template_path
+        ]
+        stamps = dict(
+            (path, stamp) for path, stamp in self._directory_stamps.items()
+            if path == template_path or
+            path.startswith(template_path + os.sep)
+        )
+        self._register_cache.save(template_path, templates, stamps)
+
+    def _register_templates(self, root, mapped, stamps=None):
         ''' Recursively fill up the given *mapped* object with the
         hierarchical content of *root*.
 
         :param root: The root path.
         :type root: str
 
-        :param mapped: The destination mapping.
-        :type mapped: dict
+        :param mapped: The destination list of children.
+        :type mapped: list
+
+        :param stamps: The stamps of the scanned directories to fill up.
+        :type stamps: dict
 
         .. note::
             This recursive function is meant to be called only
             from within the register_template function
 
         '''
-        # If the root is a folder
-        if os.path.isdir(root):
-
-            # Collect the content
-            entries = os.listdir(root)
-            entries = sorted(entries, key=lambda x : os.path.isfile(os.path.join(root, x)))
-
-            for entry in entries:
-                if entry.startswith('.git'):
-                    continue
-
-                subentry = os.path.join(root, entry)
-                permission = oct(stat.S_IMODE(os.stat(subentry).st_mode))
-
-                item = dict(
-                    name=entry,
-                    permission=permission,
-                    folder=False
+        # Collect the content, folders first
+        entries = [
+            entry for entry in scandir(root)
+            if not entry.name.startswith('.git')
+        ]
+        entries.sort(key=lambda entry: not entry.is_dir())
+
+        for entry in entries:
+            stats = entry.stat()
+            permission = oct(stat.S_IMODE(stats.st_mode))
+
+            if stat.S_ISDIR(stats.st_mode):
+                # If it's a folder, mark it with children and type
+                children = []
+                if stamps is not None:
+                    stamps[entry.path] = directory_stamp(stats)
+
+                # Continue searching in folder
+                self._register_templates(entry.path, children, stamps)
+                item = TemplateNode(
+                    entry.name, permission, children=tuple(children)
+                )
+            else:
+                # If it's a file store a lazy accessor to the content
+                item = TemplateNode(
+                    entry.name, permission, folder=False,
+                    content=TemplateContent(entry.path)
                 )
 
-                if os.path.isdir(subentry):
-                    # If it's a folder, mark it with children and type
-                    item['folder'] = True
-                    item['children'] = []
-
-                    # Continue searching in folder
-                    self._register_templates(subentry, item['children'])
-                else:
-                    # If it's a file store the content
-                    item['content'] = open(subentry, 'r').read()
-
-
-                mapped.append(item)
+            mapped.append(item)
@@ -1,8 +1,13 @@
 import os
+import copy
+import stat
+import shutil
 import unittest
 import logging
 import tempfile
+from ade.manager import filesystem
 from ade.manager.filesystem import FileSystemManager
+from ade.manager.parser import TemplateParser
 from ade.manager.template import TemplateManager
 from ade.manager.config import ConfigManager
 
@@ -180,3 +185,731 @@ log = logging.getLogger(__name__)
 
 #         for expath in expected_path:
 #             self.assertTrue(expath in path_results)
+
+
+class Test_FilesystemManagerParse(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Setup test session, using a copy of the test templates.
+        """
+        self.maxDiff = None
+        config = 'test/resources/config'
+        os.environ['ADE_CONFIG_PATH'] = config
+        config_manager = ConfigManager(config)
+        config_mode = copy.deepcopy(config_manager.get('test'))
+        self.tmp = os.path.realpath(tempfile.mkdtemp())
+        self.template_folder = os.path.join(self.tmp, 'templates')
+        shutil.copytree(
+            config_mode['template_search_path'], self.template_folder
+        )
+        config_mode['template_search_path'] = self.template_folder
+        config_mode['project_mount_point'] = self.tmp
+        self.config_mode = config_mode
+
+        self.template_manager = TemplateManager(self.config_mode)
+        self.data = {'test_A': 'Hello', 'test_B': 'World'}
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_parse(self):
+        ''' Check parse of a complete path.
+        '''
+        filesystem_manager = FileSystemManager(
+            self.config_mode, self.template_manager
+        )
+        test_path = os.path.join(self.tmp, 'Hello', 'World', 'test_C')
+        self.assertEqual(
+            filesystem_manager.parse(test_path, '@+test_A+@'), [self.data]
+        )
+
+    def test_parse_cached_parsers(self):
+        ''' Check parsers are built once per template.
+        '''
+        filesystem_manager = FileSystemManager(
+            self.config_mode, self.template_manager
+        )
+        built = self.template_manager.resolve_template('@+test_A+@')
+        parser = filesystem_manager._get_parser('@+test_A+@', built)
+        self.assertIs(
+            filesystem_manager._get_parser('@+test_A+@', built), parser
+        )
+        self.assertEqual(
+            filesystem_manager.parse(
+                os.path.join(self.tmp, 'Hello'), '@+test_A+@'
+            ),
+            [{'test_A': 'Hello'}]
+        )
+        self.assertIs(
+            filesystem_manager._get_parser('@+test_A+@', built), parser
+        )
+
+    def test_parse_regexp_mapping_changed(self):
+        ''' Check parsers are built again when the regexp_mapping changes.
+        '''
+        filesystem_manager = FileSystemManager(
+            self.config_mode, self.template_manager
+        )
+        test_path = os.path.join(self.tmp, 'Hello', 'World')
+        self.assertEqual(
+            filesystem_manager.parse(test_path, '@+test_A+@'), [self.data]
+        )
+
+        filesystem_manager.regexp_mapping['test_B'] = '(?P<test_B>[0-9]+)'
+        self.assertEqual(
+            filesystem_manager.parse(test_path, '@+test_A+@'), []
+        )
+
+    def test_parse_template_changed(self):
+        ''' Check parsers are built again when the template changes.
+        '''
+        filesystem_manager = FileSystemManager(
+            self.config_mode, self.template_manager
+        )
+        test_path = os.path.join(self.tmp, 'Hello', 'test-A2')
+        self.assertEqual(
+            filesystem_manager.parse(test_path, '@+test_A+@'), []
+        )
+
+        os.makedirs(os.path.join(self.template_folder, '@+test_A+@', 'test-A2'))
+        self.template_manager.refresh()
+        self.assertEqual(
+            filesystem_manager.parse(test_path, '@+test_A+@'),
+            [{'test_A': 'Hello'}]
+        )
+
+    def test_parse_many(self):
+        ''' Check paths are parsed in stream, with a single parser.
+        '''
+        filesystem_manager = FileSystemManager(
+            self.config_mode, self.template_manager
+        )
+        paths = [
+            os.path.join(self.tmp, 'Hello'),
+            os.path.join(self.tmp, 'Hello', 'World', 'test_C'),
+            '/outside/Hello',
+            os.path.join(self.tmp, 'Hello', 'World', 'test-X'),
+        ]
+        results = filesystem_manager.parse_many(iter(paths), '@+test_A+@')
+        self.assertEqual(next(results), (paths[0], [{'test_A': 'Hello'}]))
+        parser = filesystem_manager._parsers['@+test_A+@'][3]
+        self.assertEqual(
+            list(results),
+            [(paths[1], [self.data]), (paths[2], []), (paths[3], [])]
+        )
+        self.assertIs(filesystem_manager._parsers['@+test_A+@'][3], parser)
+
+    def test_detect(self):
+        ''' Check the template of a path is found among all the templates.
+        '''
+        filesystem_manager = FileSystemManager(
+            self.config_mode, self.template_manager
+        )
+        self.assertEqual(
+            filesystem_manager.detect(
+                os.path.join(self.tmp, 'Hello', 'World', 'test_C')
+            ),
+            dict(
+                template='@+test_A+@',
+                root=self.tmp,
+                entry=['+test_A+', '+test_B+', 'test_C'],
+                data=self.data
+            )
+        )
+        self.assertEqual(
+            filesystem_manager.detect(
+                os.path.join(self.tmp, 'test_C', 'test_C1')
+            ),
+            dict(
+                template='@test_C@', root=self.tmp,
+                entry=['test_C', 'test_C1'], data={}
+            )
+        )
+        self.assertEqual(
+            filesystem_manager.detect(os.path.join(self.tmp, 'a', 'b-c')),
+            None
+        )
+
+    def test_detect_mounted(self):
+        ''' Check templates are detected wherever they are mounted.
+        '''
+        filesystem_manager = FileSystemManager(
+            self.config_mode, self.template_manager
+        )
+        self.assertEqual(
+            filesystem_manager.detect(
+                os.path.join(self.tmp, 'a', 'b-c', 'test_D', 'test_D1')
+            ),
+            dict(
+                template='@test_D@',
+                root=os.path.join(self.tmp, 'a', 'b-c'),
+                entry=['test_D', 'test_D1'],
+                data={}
+            )
+        )
+        self.assertEqual(
+            filesystem_manager.detect(
+                os.path.join(self.tmp, 'x', 'Hello', 'World', 'test_B1')
+            ),
+            dict(
+                template='@+test_A+@',
+                root=os.path.join(self.tmp, 'x'),
+                entry=['+test_A+', '+test_B+', 'test_B1'],
+                data=self.data
+            )
+        )
+
+    def test_detect_names(self):
+        ''' Check the templates to detect are tried in the given order.
+        '''
+        filesystem_manager = FileSystemManager(
+            self.config_mode, self.template_manager
+        )
+        path = os.path.join(self.tmp, 'Hello')
+        self.assertEqual(
+            filesystem_manager.detect(path, ['@+test_B+@', '@+test_A+@']),
+            dict(
+                template='@+test_B+@', root=self.tmp,
+                entry=['+test_B+'], data={'test_B': 'Hello'}
+            )
+        )
+        self.assertEqual(
+            filesystem_manager.detect(path, ['@+test_A+@', '@+test_B+@']),
+            dict(
+                template='@+test_A+@', root=self.tmp,
+                entry=['+test_A+'], data={'test_A': 'Hello'}
+            )
+        )
+
+    def test_detect_template_changed(self):
+        ''' Check the templates are parsed again when the register changes.
+        '''
+        filesystem_manager = FileSystemManager(
+            self.config_mode, self.template_manager
+        )
+        path = os.path.join(self.tmp, 'test-G', 'test-G1')
+        self.assertEqual(filesystem_manager.detect(path), None)
+
+        os.makedirs(os.path.join(self.template_folder, '@test-G@', 'test-G1'))
+        self.template_manager.refresh()
+        self.assertEqual(
+            filesystem_manager.detect(path),
+            dict(
+                template='@test-G@', root=self.tmp,
+                entry=['test-G', 'test-G1'], data={}
+            )
+        )
+
+
+class Test_FilesystemManagerBuild(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Setup test session, using a copy of the test templates.
+        """
+        self.maxDiff = None
+        config = 'test/resources/config'
+        os.environ['ADE_CONFIG_PATH'] = config
+        config_manager = ConfigManager(config)
+        config_mode = copy.deepcopy(config_manager.get('test'))
+        self.tmp = os.path.realpath(tempfile.mkdtemp())
+        self.template_folder = os.path.join(self.tmp, 'templates')
+        shutil.copytree(
+            config_mode['template_search_path'], self.template_folder
+        )
+        self.build_folder = os.path.join(self.tmp, 'build')
+        os.makedirs(self.build_folder)
+        config_mode['template_search_path'] = self.template_folder
+        config_mode['project_mount_point'] = self.tmp
+        self.config_mode = config_mode
+
+        self.template_manager = TemplateManager(self.config_mode)
+        self.data = {'test_A': 'Hello', 'test_B': 'World'}
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def built_tree(self):
+        ''' Return the built paths, with their mode and whether
+        they are folders.
+        '''
+        tree = {}
+        for root, folders, files in os.walk(self.build_folder):
+            for name in folders + files:
+                path = os.path.join(root, name)
+                stats = os.stat(path)
+                tree[os.path.relpath(path, self.build_folder)] = (
+                    oct(stat.S_IMODE(stats.st_mode)),
+                    stat.S_ISDIR(stats.st_mode)
+                )
+
+        return tree
+
+    def expected_tree(self, path_results):
+        ''' Return the tree expected from the given *path_results*.
+        '''
+        return dict(
+            (result['path'], (result['permission'], result['folder']))
+            for result in path_results
+        )
+
+    def test_build(self):
+        ''' Check the built tree matches the template.
+        '''
+        filesystem_manager = FileSystemManager(
+            self.config_mode, self.template_manager
+        )
+        path_results = filesystem_manager.build(
+            '@+test_A+@', dict(self.data), self.build_folder
+        )
+        self.assertIn(os.path.join('Hello', 'World', 'test_C'), [
+            result['path'] for result in path_results
+        ])
+        self.assertEqual(self.built_tree(), self.expected_tree(path_results))
+
+    def test_build_parallel(self):
+        ''' Check the tree built concurrently matches the template.
+        '''
+        config_mode = dict(self.config_mode, build_workers=4)
+        filesystem_manager = FileSystemManager(
+            config_mode, self.template_manager
+        )
+        path_results = filesystem_manager.build(
+            '@+test_A+@', dict(self.data), self.build_folder
+        )
+        self.assertEqual(self.built_tree(), self.expected_tree(path_results))
+
+    def test_build_many(self):
+        ''' Check each record builds the same tree as its own build,
+        and failing records are reported along with their error.
+        '''
+        records = [
+            {'test_A': 'Hello', 'test_B': 'World'},
+            {'test_A': 5, 'test_B': 'World'},
+            {'test_A': 'Hello', 'test_B': 'There'},
+            {'test_A': 'Goodbye', 'test_B': 'World'},
+        ]
+        for build_workers in (1, 4):
+            config_mode = dict(self.config_mode, build_workers=build_workers)
+            filesystem_manager = FileSystemManager(
+                config_mode, self.template_manager
+            )
+            built = list(filesystem_manager.build_many(
+                '@+test_A+@', (dict(data) for data in records),
+                self.build_folder
+            ))
+            self.assertEqual(
+                [(data['test_A'], data['test_B']) for data, _, _ in built],
+                [(data['test_A'], data['test_B']) for data in records]
+            )
+
+            data, path_results, error = built.pop(1)
+            self.assertEqual(path_results, [])
+            self.assertIsInstance(error, TypeError)
+
+            expected = {}
+            for data, path_results, error in built:
+                self.assertIsNone(error)
+                self.assertEqual(
+                    path_results,
+                    filesystem_manager._to_path(
+                        self.template_manager.iter_resolve(
+                            self.template_manager.resolve_template(
+                                '@+test_A+@'
+                            )
+                        ),
+                        dict(data)
+                    )
+                )
+                expected.update(self.expected_tree(path_results))
+
+            self.assertEqual(self.built_tree(), expected)
+            shutil.rmtree(self.build_folder)
+            os.makedirs(self.build_folder)
+
+    def test_build_many_closed(self):
+        ''' Check closing the generator stops building the records.
+        '''
+        config_mode = dict(self.config_mode, build_workers=4)
+        filesystem_manager = FileSystemManager(
+            config_mode, self.template_manager
+        )
+        pulled = []
+
+        def records():
+            for index in range(200):
+                pulled.append(index)
+                yield {'test_A': 'show_{0}'.format(index), 'test_B': 'World'}
+
+        built = filesystem_manager.build_many(
+            '@+test_A+@', records(), self.build_folder
+        )
+        next(built)
+        built.close()
+
+        in_flight = filesystem.BUILD_AHEAD * 4 + 1
+        self.assertTrue(len(pulled) <= in_flight)
+        self.assertTrue(len(os.listdir(self.build_folder)) <= len(pulled))
+
+    def test_build_many_umask(self):
+        ''' Check the umask is read once, not by each worker.
+        '''
+        config_mode = dict(self.config_mode, build_workers=4)
+        filesystem_manager = FileSystemManager(
+            config_mode, self.template_manager
+        )
+        current_umask = filesystem.current_umask
+        read = []
+
+        def counted_umask():
+            read.append(True)
+            return current_umask()
+
+        filesystem.current_umask = counted_umask
+        try:
+            built = list(filesystem_manager.build_many(
+                '@+test_A+@', (
+                    {'test_A': 'show_{0}'.format(index), 'test_B': 'World'}
+                    for index in range(8)
+                ),
+                self.build_folder
+            ))
+        finally:
+            filesystem.current_umask = current_umask
+
+        self.assertEqual(len(built), 8)
+        self.assertEqual(len(read), 1)
+
+    def test_build_permissions(self):
+        ''' Check permissions are set afterwards only where needed.
+        '''
+        locked = os.path.join(self.template_folder, '@test_L@', 'locked')
+        os.makedirs(os.path.join(locked, 'inner'))
+        with open(os.path.join(locked, 'inner.txt'), 'w') as file_data:
+            file_data.write('inner')
+
+        os.chmod(os.path.join(locked, 'inner'), 0o750)
+        os.chmod(os.path.join(locked, 'inner.txt'), 0o444)
+        os.chmod(locked, 0o555)
+        self.template_manager.register_templates()
+
+        changed = []
+
+        class ChmodFileSystemManager(FileSystemManager):
+            def _set_permission(self, root, result):
+                changed.append(result['path'])
+                return super(ChmodFileSystemManager, self)._set_permission(
+                    root, result
+                )
+
+        filesystem_manager = ChmodFileSystemManager(
+            self.config_mode, self.template_manager
+        )
+        umask = os.umask(0o027)
+        try:
+            path_results = filesystem_manager.build(
+                '@test_L@', {}, self.build_folder
+            )
+            tree = self.built_tree()
+        finally:
+            os.umask(umask)
+            os.chmod(os.path.join(self.build_folder, 'test_L', 'locked'), 0o755)
+            os.chmod(locked, 0o755)
+
+        self.assertEqual(tree, self.expected_tree(path_results))
+        self.assertEqual(
+            sorted(changed),
+            sorted(
+                result['path'] for result in path_results
+                if int(result['permission'], 8) & 0o027
+            )
+        )
+        self.assertIn(os.path.join('test_L', 'locked'), changed)
+        self.assertNotIn(os.path.join('test_L', 'locked', 'inner'), changed)
+
+        # Existing entries get their permission set again
+        del changed[:]
+        filesystem_manager.build('@test_L@', {}, self.build_folder)
+        os.chmod(os.path.join(self.build_folder, 'test_L', 'locked'), 0o755)
+        self.assertEqual(len(changed), len(path_results))
+
+    def test_build_incremental(self):
+        ''' Check only the missing or different paths are built again.
+        '''
+        filesystem_manager = FileSystemManager(
+            self.config_mode, self.template_manager
+        )
+        summary = filesystem_manager.build_incremental(
+            '@+test_A+@', dict(self.data), self.build_folder
+        )
+        paths = summary['created']
+        self.assertEqual(
+            self.built_tree(), self.expected_tree(
+                filesystem_manager.build(
+                    '@+test_A+@', dict(self.data), self.build_folder
+                )
+            )
+        )
+
+        summary = filesystem_manager.build_incremental(
+            '@+test_A+@', dict(self.data), self.build_folder
+        )
+        self.assertEqual(
+            summary,
+            dict(
+                created=[], written=[], permissions=[], unchanged=paths,
+                skipped=[], failed=[]
+            )
+        )
+
+        test_C = os.path.join('Hello', 'World', 'test_C')
+        file_B = os.path.join('Hello', 'World', 'file_B.txt')
+        test_A1 = os.path.join('Hello', 'test_A1')
+        shutil.rmtree(os.path.join(self.build_folder, test_C))
+        with open(os.path.join(self.build_folder, file_B), 'w') as file_data:
+            file_data.write('changed')
+
+        os.chmod(os.path.join(self.build_folder, test_A1), 0o700)
+        summary = filesystem_manager.build_incremental(
+            '@+test_A+@', dict(self.data), self.build_folder
+        )
+        self.assertEqual(
+            summary['created'],
+            [path for path in paths if path.startswith(test_C)]
+        )
+        self.assertEqual(summary['written'], [file_B])
+        self.assertEqual(summary['permissions'], [test_A1])
+        self.assertEqual(summary['skipped'], [])
+        self.assertEqual(
+            self.built_tree(), self.expected_tree(
+                filesystem_manager.build(
+                    '@+test_A+@', dict(self.data), self.build_folder
+                )
+            )
+        )
+
+    def test_build_incremental_rewrite(self):
+        ''' Check files get the permission letting them be written first,
+        and the failed operations are reported apart.
+        '''
+        operations = []
+        failing = []
+
+        class RewriteFileSystemManager(FileSystemManager):
+            def _set_permission(self, root, result):
+                operations.append(('chmod', result['path']))
+                return super(RewriteFileSystemManager, self)._set_permission(
+                    root, result
+                )
+
+            def _write_file(self, root, result):
+                operations.append(('write', result['path']))
+                if result['path'] in failing:
+                    return False
+
+                return super(RewriteFileSystemManager, self)._write_file(
+                    root, result
+                )
+
+        filesystem_manager = RewriteFileSystemManager(
+            self.config_mode, self.template_manager
+        )
+        path_results = filesystem_manager.build(
+            '@+test_A+@', dict(self.data), self.build_folder
+        )
+        file_B = os.path.join('Hello', 'World', 'file_B.txt')
+        file_D = os.path.join(
+            'Hello', 'World', 'test_C', 'test_C1', 'test_D', 'test_D1.txt'
+        )
+        for path in (file_B, file_D):
+            path = os.path.join(self.build_folder, path)
+            with open(path, 'w') as file_data:
+                file_data.write('changed')
+
+            os.chmod(path, 0o444)
+
+        del operations[:]
+        failing.append(file_D)
+        summary = filesystem_manager.build_incremental(
+            '@+test_A+@', dict(self.data), self.build_folder
+        )
+        self.assertEqual(
+            [operation for operation in operations if operation[1] == file_B],
+            [('chmod', file_B), ('write', file_B)]
+        )
+        self.assertEqual(summary['written'], [file_B])
+        self.assertEqual(summary['permissions'], [file_B])
+        self.assertEqual(summary['failed'], [file_D])
+
+        failing.remove(file_D)
+        filesystem_manager.build_incremental(
+            '@+test_A+@', dict(self.data), self.build_folder
+        )
+        self.assertEqual(self.built_tree(), self.expected_tree(path_results))
+
+    def test_build_incremental_blocked(self):
+        ''' Check nothing is created below a path existing as another type,
+        and the paths which could not be created are reported apart.
+        '''
+        scanned = []
+
+        class BlindFileSystemManager(FileSystemManager):
+            def _scan_existing(self, root, path_results):
+                if scanned:
+                    return {}
+
+                return super(BlindFileSystemManager, self)._scan_existing(
+                    root, path_results
+                )
+
+        filesystem_manager = BlindFileSystemManager(
+            self.config_mode, self.template_manager
+        )
+        world = os.path.join('Hello', 'World')
+        os.makedirs(os.path.join(self.build_folder, 'Hello'))
+        with open(os.path.join(self.build_folder, world), 'w') as file_data:
+            file_data.write('file')
+
+        summary = filesystem_manager.build_incremental(
+            '@+test_A+@', dict(self.data), self.build_folder
+        )
+        blocked = [
+            path for path in summary['skipped']
+            if path.startswith(world + os.sep)
+        ]
+        self.assertTrue(blocked)
+        self.assertIn(world, summary['skipped'])
+        self.assertEqual(summary['failed'], [])
+        self.assertFalse([
+            path for path in summary['created'] if path.startswith(world)
+        ])
+        self.assertTrue(
+            os.path.isfile(os.path.join(self.build_folder, world))
+        )
+
+        # The creations below the file fail when it is not known
+        scanned.append(True)
+        summary = filesystem_manager.build_incremental(
+            '@+test_A+@', dict(self.data), self.build_folder
+        )
+        self.assertEqual(summary['failed'], [world] + blocked)
+        self.assertFalse([
+            path for path in summary['created'] if path.startswith(world)
+        ])
+
+    def test_build_plan(self):
+        ''' Check the planned operations match the build, without building.
+        '''
+        changed = []
+
+        class ChmodFileSystemManager(FileSystemManager):
+            def _set_permission(self, root, result):
+                changed.append(os.path.join(root, result['path']))
+                return super(ChmodFileSystemManager, self)._set_permission(
+                    root, result
+                )
+
+        filesystem_manager = ChmodFileSystemManager(
+            self.config_mode, self.template_manager
+        )
+        umask = os.umask(0o027)
+        try:
+            plan = filesystem_manager.build_plan(
+                '@+test_A+@', dict(self.data), self.build_folder
+            )
+            self.assertEqual(os.listdir(self.build_folder), [])
+            path_results = filesystem_manager.build(
+                '@+test_A+@', dict(self.data), self.build_folder
+            )
+        finally:
+            os.umask(umask)
+
+        operations = [
+            (operation['operation'], operation['path'])
+            for operation in plan['operations']
+        ]
+        self.assertEqual(
+            [path for operation, path in operations if operation == 'chmod'],
+            changed
+        )
+        self.assertEqual(
+            sorted(path for operation, path in operations if operation != 'chmod'),
+            sorted(
+                os.path.join(self.build_folder, result['path'])
+                for result in path_results
+            )
+        )
+        self.assertEqual(plan['inodes'], len(path_results))
+        self.assertEqual(plan['bytes'], sum(
+            os.path.getsize(os.path.join(self.build_folder, result['path']))
+            for result in path_results if not result['folder']
+        ))
+
+        plan = filesystem_manager.build_plan(
+            '@+test_A+@', dict(self.data), self.build_folder, incremental=True
+        )
+        self.assertEqual(plan, dict(operations=[], inodes=0, bytes=0))
+
+
+class Test_TemplateParser(unittest.TestCase):
+
+    def test_first_parser(self):
+        ''' Check the first matching parser wins, as tried in order.
+        '''
+        parser = TemplateParser([
+            ['(?P<test_A>[a-z]+)'],
+            ['(?P<test_A>[a-z]+)', '(?P<test_B>[a-z]+)'],
+            ['(?P<test_B>[a-z_]+)', '(?P<test_A>[a-z]+)'],
+        ])
+        self.assertEqual(parser.match('foo'), {'test_A': 'foo'})
+        self.assertEqual(
+            parser.match('foo/bar'), {'test_A': 'foo', 'test_B': 'bar'}
+        )
+        self.assertEqual(
+            parser.match('foo_a/bar'), {'test_A': 'bar', 'test_B': 'foo_a'}
+        )
+        self.assertEqual(parser.match('foo/bar/baz'), None)
+
+    def test_many_parsers(self):
+        ''' Check parsers sharing their components match.
+        '''
+        parser = TemplateParser([
+            ['(?P<test_A>x{{{0}}})'.format(count), '(?P<test_B>y)']
+            for count in range(1, 101)
+        ])
+        for count in (1, 50, 100):
+            self.assertEqual(
+                parser.match('x' * count + '/y'),
+                {'test_A': 'x' * count, 'test_B': 'y'}
+            )
+
+    def test_repeated_variable(self):
+        ''' Check variables repeated in a parser, eg: prefixed entries.
+        '''
+        parser = TemplateParser([
+            ['(?P<test_E>[a-z]+)', 'pfx_(?P<test_E>[a-z]+)_sfx'],
+        ])
+        self.assertEqual(parser.match('foo/pfx_bar_sfx'), {'test_E': 'bar'})
+        self.assertEqual(parser.match('foo/bar'), None)
+
+    def test_parsed_prefixes(self):
+        ''' Check paths reuse the parse of their parent.
+        '''
+        parser = TemplateParser([
+            ['(?P<test_A>[a-z]+)'],
+            ['(?P<test_A>[a-z]+)', 'test_C'],
+            ['(?P<test_A>[a-z]+)', '(?P<test_B>[a-z]+)'],
+        ], cache_size=2)
+        self.assertEqual(
+            parser.match('foo/bar'), {'test_A': 'foo', 'test_B': 'bar'}
+        )
+        self.assertEqual(list(parser._prefixes), [('foo',), ('foo', 'bar')])
+
+        self.assertEqual(parser.match('foo/test_C'), {'test_A': 'foo'})
+        self.assertEqual(
+            list(parser._prefixes), [('foo',), ('foo', 'test_C')]
+        )
+        self.assertEqual(
+            parser.match('foo/baz'), {'test_A': 'foo', 'test_B': 'baz'}
+        )
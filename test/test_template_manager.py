@@ -1,11 +1,19 @@
 import os
+import json
 import unittest
 import tempfile
 import logging
 import copy
+import shutil
 
 from ade.manager.template import TemplateManager
+from ade.manager.filesystem import FileSystemManager
+from ade.manager import artifact
+from ade.manager.artifact import TemplateArtifact
+from ade.manager.content import TemplateContent, ContentStore, content_store
+from ade.manager.node import TemplateNode, ResolvedEntry
 from ade.manager.config import ConfigManager
+from ade.manager.exceptions import ConfigError, TemplateError
 
 logging.getLogger(__name__)
 
@@ -244,6 +252,66 @@ class Test_TemplateManagerFindPath(unittest.TestCase):
         self.assertEqual(result, expexted_result)
 
 
+    def test_path_find_batch(self):
+        template_manager = TemplateManager(self.config_mode)
+        result = template_manager.find_path_batch([
+            dict(endswith='test_D1'),
+            dict(startwith='foobar'),
+            dict(contains=['test_B'], endswith='file_B.txt')
+        ], template_name=self.template_name)
+
+        expexted_result = [
+            [
+                '+test_A+',
+                '+test_B+',
+                'test_C',
+                'test_C1',
+                'test_D',
+                'test_D1'
+            ],
+            None,
+            ['+test_A+', '+test_B+', 'file_B.txt']
+        ]
+
+        self.assertEqual(result, expexted_result)
+
+    def test_path_index_contains_ranges(self):
+        template_manager = TemplateManager(self.config_mode)
+        index = template_manager.compile_template(self.template_name).path_index
+        # test_C is contained by test_C and all of its children
+        self.assertEqual(len(index._contains_ranges('test_C')), 5)
+        self.assertEqual(index.find(contains=['test_C', 'test_B1']), None)
+        self.assertEqual(index.find(contains=['B+', 'test_D1']), 8)
+
+    def test_paths_find_depth(self):
+        template_manager = TemplateManager(self.config_mode)
+        result = template_manager.find_paths(
+            contains=['test_C'],
+            template_name=self.template_name)
+
+        self.assertEqual(next(result), ['+test_A+', '+test_B+', 'test_C'])
+        self.assertEqual(len(list(result)), 4)
+
+    def test_paths_find_lexical(self):
+        template_manager = TemplateManager(self.config_mode)
+        result = template_manager.find_paths(
+            startwith='test_A',
+            endswith='test_D1',
+            template_name='@+test_A+@',
+            order='lexical')
+
+        expexted_result = [
+            ['+test_A+', '+test_B+', 'test_C', 'test_C1', 'test_D', 'test_D1']
+        ]
+        self.assertEqual(list(result), expexted_result)
+
+    def test_paths_find_unknown_order(self):
+        template_manager = TemplateManager(self.config_mode)
+        result = template_manager.find_paths(
+            template_name=self.template_name, order='foobar')
+
+        self.assertRaises(ValueError, list, result)
+
 class Test_TemplateManager(unittest.TestCase):
 
     def setUp(self):
@@ -712,3 +780,657 @@ class Test_TemplateManager(unittest.TestCase):
             ])
         ]
         self.assertEqual(resolved, expected_result)
+
+    def test_registered_templates_parallel(self):
+        ''' Check templates scanned concurrently match the serial scan.
+        '''
+        expected = TemplateManager(self.config_mode).register
+
+        config_mode = dict(self.config_mode, template_scan_workers=4)
+        manager = TemplateManager(config_mode)
+        self.assertEqual(manager.register, expected)
+
+    def test_registered_templates_are_nodes(self):
+        ''' Check templates are registered as compact nodes.
+        '''
+        manager = TemplateManager(self.config_mode)
+        template = manager.get_template('@test_D@')
+        self.assertIsInstance(template, TemplateNode)
+        self.assertFalse(hasattr(template, '__dict__'))
+        self.assertEqual(
+            sorted(template.keys()),
+            ['children', 'folder', 'name', 'permission']
+        )
+        self.assertEqual(
+            sorted(template['children'][-1].keys()),
+            ['content', 'folder', 'name', 'permission']
+        )
+
+    def test_resolve_path_entries(self):
+        ''' Check resolved entries only reference their parent entry.
+        '''
+        manager = TemplateManager(self.config_mode)
+        resolved = list(
+            manager.iter_resolve(manager.resolve_template('@+test_A+@'))
+        )
+        root, entry = resolved[0], resolved[-1]
+        self.assertIsInstance(entry, ResolvedEntry)
+        self.assertIs(entry.parent.parent, root)
+        self.assertEqual(entry.depth, 2)
+        self.assertEqual(entry['path'], ['+test_A+', '+test_B+', 'file_B.txt'])
+
+    def test_iter_resolve(self):
+        ''' Check entries are streamed in the same order of resolve.
+        '''
+        manager = TemplateManager(self.config_mode)
+        schema = manager.resolve_template('@+test_A+@')
+        entries = manager.iter_resolve(schema)
+        self.assertEqual(next(entries)['path'], ['+test_A+'])
+        self.assertEqual(next(entries)['path'], ['+test_A+', 'test_A1'])
+        self.assertEqual(
+            [entry['path'] for entry in manager.iter_resolve(schema)],
+            [entry['path'] for entry in manager.resolve(schema)]
+        )
+
+    def test_plain_register_and_resolve(self):
+        ''' Check the registered templates and the resolved entries
+        convert to plain dictionaries, as json encodable as before.
+        '''
+        manager = TemplateManager(self.config_mode)
+        schema = manager.resolve_template('@+test_A+@')
+        resolved = manager.resolve(schema)
+        self.assertIsInstance(resolved[-1], ResolvedEntry)
+        self.assertIsInstance(resolved[-1]['content'], TemplateContent)
+
+        plain = [entry.to_dict() for entry in resolved]
+        self.assertIsInstance(plain[-1], dict)
+        self.assertEqual(plain[-1], dict(
+            path=['+test_A+', '+test_B+', 'file_B.txt'],
+            permission=resolved[-1]['permission'],
+            folder=False,
+            content='test'
+        ))
+        self.assertEqual(json.loads(json.dumps(plain)), plain)
+
+        register = [template.to_dict() for template in manager.register]
+        self.assertTrue(all(isinstance(template, dict) for template in register))
+        self.assertEqual(json.loads(json.dumps(register)), register)
+
+    def test_register_index(self):
+        ''' Check the name index is in sync with the register.
+        '''
+        manager = TemplateManager(self.config_mode)
+        self.assertEqual(
+            manager.template_names,
+            [template['name'] for template in manager.register]
+        )
+        for name in manager.template_names:
+            self.assertTrue(manager.has_template(name))
+
+        self.assertFalse(manager.has_template('@+test_fake+@'))
+        self.assertRaises(KeyError, manager.get_template, '@+test_fake+@')
+
+    def test_get_in_register_returns_copy(self):
+        ''' Check the register is not affected by changes on lookups.
+        '''
+        manager = TemplateManager(self.config_mode)
+        template = manager._get_in_register('@+test_A+@')
+        template['children'].append(dict(name='foo', folder=True))
+        self.assertNotEqual(
+            template, manager.get_template('@+test_A+@')
+        )
+
+    def test_resolve_template_cached(self):
+        ''' Check resolved templates are shared and read only.
+        '''
+        manager = TemplateManager(self.config_mode)
+        result = manager.resolve_template('@+test_A+@')
+        self.assertIs(result, manager.resolve_template('@+test_A+@'))
+        with self.assertRaises(TypeError):
+            result['name'] = 'foo'
+
+        self.assertIsInstance(result['children'], tuple)
+
+    def test_resolve_template_invalidated(self):
+        ''' Check registering templates drops the resolved ones.
+        '''
+        manager = TemplateManager(self.config_mode)
+        result = manager.resolve_template('@+test_A+@')
+        manager.register_templates()
+        self.assertIsNot(result, manager.resolve_template('@+test_A+@'))
+        self.assertEqual(result, manager.resolve_template('@+test_A+@'))
+
+    def test_resolve_template_mutable(self):
+        ''' Check changes on a mutable template do not leak in the cache.
+        '''
+        manager = TemplateManager(self.config_mode)
+        expected = copy.deepcopy(manager.resolve_template('@+test_A+@'))
+
+        result = manager.resolve_template('@+test_A+@', mutable=True)
+        self.assertEqual(result, expected)
+        result['name'] = 'foo'
+        result['children'][1]['children'].pop()
+        result['children'][1]['children'][0]['name'] = 'bar'
+
+        self.assertEqual(manager.resolve_template('@+test_A+@'), expected)
+
+    def test_registered_content_is_lazy(self):
+        ''' Check file contents are read only on demand.
+        '''
+        manager = TemplateManager(self.config_mode)
+        file_B = manager.get_template('@+test_A+@')['children'][1]['children'][0]
+        content = file_B['content']
+        self.assertIsInstance(content, TemplateContent)
+        self.assertTrue(content.path.endswith('file_B.txt'))
+        self.assertEqual(content.read(), 'test')
+
+
+class Test_ContentStore(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Setup test session, with a folder for the stored files.
+        """
+        self.maxDiff = None
+        config = 'test/resources/config'
+        os.environ['ADE_CONFIG_PATH'] = config
+        config_manager = ConfigManager(config)
+        config_mode = copy.deepcopy(config_manager.get('test'))
+        self.tmp = tempfile.mkdtemp()
+        config_mode['project_mount_point'] = self.tmp
+        self.config_mode = config_mode
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_content_store_deduplicates(self):
+        ''' Check files with the same content share the stored content.
+        '''
+        manager = TemplateManager(self.config_mode)
+        file_D = manager.get_template('@test_D@')['children'][-1]['content']
+        file_Z = manager.get_template(
+            '@+test_Z+@'
+        )['children'][-1]['children'][0]['content']
+
+        self.assertNotEqual(file_D.path, file_Z.path)
+        self.assertEqual(file_D.key, file_Z.key)
+        self.assertIs(file_D.read(), file_Z.read())
+        self.assertEqual(file_D, file_Z)
+
+    def test_content_store_reads_changes(self):
+        ''' Check the stored content follows the changes of the file.
+        '''
+        store = ContentStore()
+        path = os.path.join(self.tmp, 'file')
+        with open(path, 'w') as file_data:
+            file_data.write('foo')
+
+        self.assertEqual(store.read(path), 'foo')
+        with open(path, 'w') as file_data:
+            file_data.write('foobar')
+
+        self.assertEqual(store.read(path), 'foobar')
+        self.assertEqual(len(store), 1)
+
+    def test_content_store_releases_contents(self):
+        ''' Check contents are dropped once no file uses them.
+        '''
+        store = ContentStore()
+        folder = os.path.join(self.tmp, 'store')
+        os.makedirs(folder)
+        paths = [os.path.join(folder, name) for name in ('foo', 'bar')]
+        for path in paths:
+            with open(path, 'w') as file_data:
+                file_data.write('foo')
+
+        key = store.key(paths[0])
+        self.assertEqual(store.key(paths[1]), key)
+        with open(paths[0], 'w') as file_data:
+            file_data.write('changed')
+
+        self.assertEqual(store.read(paths[0]), 'changed')
+        self.assertEqual(store.get(key), 'foo')
+        self.assertEqual(len(store), 2)
+
+        os.remove(paths[1])
+        self.assertRaises(OSError, store.read, paths[1])
+        self.assertRaises(KeyError, store.get, key)
+        self.assertEqual(len(store), 1)
+
+        stored = store.add('changed')
+        store.forget(folder)
+        self.assertEqual(store.get(stored), 'changed')
+        self.assertEqual(len(store), 1)
+
+        store.release([stored])
+        self.assertRaises(KeyError, store.get, stored)
+        self.assertEqual(len(store), 0)
+
+
+class Test_TemplateManagerCache(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Setup test session, using a copy of the test templates.
+        """
+        self.maxDiff = None
+        config = 'test/resources/config'
+        os.environ['ADE_CONFIG_PATH'] = config
+        config_manager = ConfigManager(config)
+        config_mode = copy.deepcopy(config_manager.get('test'))
+        self.tmp = tempfile.mkdtemp()
+        template_folder = os.path.join(self.tmp, 'templates')
+        shutil.copytree(config_mode['template_search_path'], template_folder)
+        config_mode['template_search_path'] = template_folder
+        config_mode['template_cache_path'] = os.path.join(self.tmp, 'cache')
+        config_mode['project_mount_point'] = self.tmp
+        self.config_mode = config_mode
+        self.template_folder = os.path.realpath(template_folder)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_cache_reused(self):
+        ''' Check an unchanged template folder is not walked again.
+        '''
+        expected = TemplateManager(self.config_mode).register
+
+        scanned = []
+
+        class ScanTemplateManager(TemplateManager):
+            def _scan_templates(self, template_path):
+                scanned.append(template_path)
+                return super(ScanTemplateManager, self)._scan_templates(
+                    template_path
+                )
+
+        manager = ScanTemplateManager(self.config_mode)
+        self.assertEqual(scanned, [])
+        self.assertEqual(manager.register, expected)
+
+    def test_cache_lazy(self):
+        ''' Check a lazy manager registers from a valid cache only.
+        '''
+        cache_folder = self.config_mode['template_cache_path']
+        manager = TemplateManager(self.config_mode, lazy=True)
+        self.assertFalse(os.path.exists(cache_folder))
+        self.assertEqual(manager.template_names, [])
+
+        manager.resolve_template('@+test_A+@')
+        manager.refresh([self.template_folder])
+        self.assertFalse(os.path.exists(cache_folder))
+
+        names = TemplateManager(self.config_mode).template_names
+        manager = TemplateManager(self.config_mode, lazy=True)
+        self.assertEqual(manager.template_names, names)
+
+        # A changed template folder is scanned on demand again
+        os.mkdir(os.path.join(self.template_folder, '@test_D@', 'test_D2'))
+        manager = TemplateManager(self.config_mode, lazy=True)
+        self.assertEqual(manager.template_names, [])
+        self.assertIn('test_D2', [
+            child['name'] for child in
+            manager.get_template('@test_D@')['children']
+        ])
+
+    def test_cache_invalidated(self):
+        ''' Check a new entry in the template folder invalidates the cache.
+        '''
+        TemplateManager(self.config_mode)
+        os.mkdir(os.path.join(self.template_folder, '@test_D@', 'test_D2'))
+
+        manager = TemplateManager(self.config_mode)
+        names = [
+            child['name'] for child in
+            manager.get_template('@test_D@')['children']
+        ]
+        self.assertIn('test_D2', names)
+
+    def test_refresh_unchanged(self):
+        ''' Check nothing is refreshed when nothing changed.
+        '''
+        manager = TemplateManager(self.config_mode)
+        resolved = manager.resolve_template('@+test_A+@')
+        self.assertEqual(manager.refresh(), [])
+        self.assertIs(manager.resolve_template('@+test_A+@'), resolved)
+
+    def test_refresh_changed_template(self):
+        ''' Check only the changed template and its dependents are refreshed.
+        '''
+        manager = TemplateManager(self.config_mode)
+        resolved_A = manager.resolve_template('@+test_A+@')
+        resolved_R = manager.resolve_template('@+test_R+@')
+        os.mkdir(os.path.join(
+            self.template_folder, '@test_C@', 'test_C1', 'test_C2'
+        ))
+
+        self.assertEqual(manager.refresh(), ['@test_C@'])
+        names = [
+            child['name'] for child in
+            manager.get_template('@test_C@')['children'][0]['children']
+        ]
+        self.assertEqual(names, ['test_C2', '@test_D@'])
+        self.assertIsNot(manager.resolve_template('@+test_A+@'), resolved_A)
+        self.assertIs(manager.resolve_template('@+test_R+@'), resolved_R)
+
+    def test_refresh_added_and_removed_templates(self):
+        ''' Check templates added and removed from the template folder.
+        '''
+        manager = TemplateManager(self.config_mode)
+        os.mkdir(os.path.join(self.template_folder, '@test_G@'))
+        shutil.rmtree(os.path.join(self.template_folder, '@Work@'))
+
+        self.assertEqual(manager.refresh(), ['@Work@', '@test_G@'])
+        self.assertTrue(manager.has_template('@test_G@'))
+        self.assertFalse(manager.has_template('@Work@'))
+        self.assertEqual(
+            [template['name'] for template in manager.register],
+            sorted(
+                [template['name'] for template in manager.register],
+                key=lambda x: x.replace('@', '').replace('+', '').lower()
+            )
+        )
+        self.assertRaises(KeyError, manager.resolve_template, '@+shot_task+@')
+
+    def test_refresh_updates_cache(self):
+        ''' Check the refreshed register is stored in the cache.
+        '''
+        manager = TemplateManager(self.config_mode)
+        os.mkdir(os.path.join(self.template_folder, '@test_G@'))
+        manager.refresh()
+
+        self.assertEqual(
+            TemplateManager(self.config_mode).register, manager.register
+        )
+
+
+class Test_TemplateManagerCompile(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Setup test session, using a copy of the test templates.
+        """
+        self.maxDiff = None
+        config = 'test/resources/config'
+        os.environ['ADE_CONFIG_PATH'] = config
+        config_manager = ConfigManager(config)
+        config_mode = copy.deepcopy(config_manager.get('test'))
+        self.tmp = tempfile.mkdtemp()
+        template_folder = os.path.join(self.tmp, 'templates')
+        shutil.copytree(config_mode['template_search_path'], template_folder)
+        config_mode['template_search_path'] = template_folder
+        config_mode['project_mount_point'] = self.tmp
+        self.config_mode = config_mode
+        self.template_folder = os.path.realpath(template_folder)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_compile_template(self):
+        ''' Check the compiled template matches the resolved one.
+        '''
+        manager = TemplateManager(self.config_mode)
+        compiled = manager.compile_template('@+test_A+@')
+        schema = manager.resolve_template('@+test_A+@')
+        self.assertIs(compiled.template, schema)
+        self.assertIs(manager.compile_template('@+test_A+@'), compiled)
+        self.assertEqual(len(compiled), 11)
+        self.assertEqual(manager.resolve(schema), list(compiled))
+
+    def test_self_reference(self):
+        ''' Check a template referencing itself raises a TemplateError.
+        '''
+        os.makedirs(os.path.join(
+            self.template_folder, '@test_G@', 'test_G1', '@test_G@'
+        ))
+        manager = TemplateManager(self.config_mode)
+        self.assertRaises(TemplateError, manager.resolve_template, '@test_G@')
+
+    def test_transitive_reference(self):
+        ''' Check templates referencing each other raise a TemplateError.
+        '''
+        os.makedirs(os.path.join(self.template_folder, '@test_G@', '@test_H@'))
+        os.makedirs(os.path.join(self.template_folder, '@test_H@', '@test_G@'))
+        manager = TemplateManager(self.config_mode)
+        with self.assertRaises(TemplateError) as context:
+            manager.resolve_template('@test_G@')
+
+        self.assertIn('@test_G@ -> @test_H@ -> @test_G@', str(context.exception))
+        self.assertEqual(
+            manager.resolve_template('@+test_A+@'),
+            TemplateManager(self.config_mode).resolve_template('@+test_A+@')
+        )
+
+    def test_artifact(self):
+        ''' Check templates load from an artifact, without the templates.
+        '''
+        manager = TemplateManager(self.config_mode)
+        filesystem = FileSystemManager(self.config_mode, manager)
+        artifact_path = os.path.join(self.tmp, 'templates.ade')
+        TemplateArtifact.from_managers(manager, filesystem).save(artifact_path)
+        schema = manager.resolve_template('@+test_A+@')
+        parsers = filesystem._to_components(manager.resolve(schema))
+        content = manager.get_template('@test_D@')['children'][-1]['content']
+        content = content.read()
+        shutil.rmtree(self.template_folder)
+
+        config_mode = dict(
+            self.config_mode, template_artifact_path=artifact_path
+        )
+        loaded = TemplateManager(config_mode)
+        self.assertIsNotNone(loaded.artifact)
+        self.assertEqual(loaded.resolve_template('@+test_A+@'), schema)
+        self.assertEqual(loaded.template_names, manager.template_names)
+        self.assertEqual(
+            loaded.get_template('@test_D@')['children'][-1]['content'],
+            content
+        )
+
+        loaded_filesystem = FileSystemManager(config_mode, loaded)
+        built = loaded.resolve_template('@+test_A+@')
+        self.assertEqual(
+            loaded_filesystem._get_parser('@+test_A+@', built).parsers,
+            parsers
+        )
+        self.assertEqual(
+            loaded_filesystem.parse(
+                os.path.join(self.tmp, 'Hello', 'World'), '@+test_A+@'
+            ),
+            [{'test_A': 'Hello', 'test_B': 'World'}]
+        )
+
+    def test_artifact_version(self):
+        ''' Check outdated artifacts are not loaded.
+        '''
+        manager = TemplateManager(self.config_mode)
+        artifact_path = os.path.join(self.tmp, 'templates.ade')
+        TemplateArtifact.from_managers(
+            manager, names=['@+test_A+@']
+        ).save(artifact_path)
+
+        # Simulate an artifact written by another version
+        artifact.ARTIFACT_VERSION += 1
+        try:
+            self.assertRaises(
+                TemplateError, TemplateArtifact.load, artifact_path
+            )
+            loaded = TemplateManager(dict(
+                self.config_mode, template_artifact_path=artifact_path
+            ))
+        finally:
+            artifact.ARTIFACT_VERSION -= 1
+
+        self.assertIsNone(loaded.artifact)
+        self.assertTrue(loaded.has_template('@test_D@'))
+
+    def test_artifact_released(self):
+        ''' Check the contents of a replaced artifact are released.
+        '''
+        manager = TemplateManager(self.config_mode)
+        artifact_path = os.path.join(self.tmp, 'templates.ade')
+        TemplateArtifact.from_managers(manager).save(artifact_path)
+        key = manager.get_template('@test_D@')['children'][-1]['content'].key
+        references = content_store._references.get(key)
+
+        for replace in (
+            lambda: manager.load_artifact(TemplateArtifact.load(artifact_path)),
+            manager.register_templates
+        ):
+            manager.load_artifact(TemplateArtifact.load(artifact_path))
+            self.assertEqual(
+                content_store._references.get(key), references + 1
+            )
+            replace()
+            self.assertEqual(
+                content_store._references.get(key),
+                references + (manager.artifact is not None)
+            )
+
+        self.assertIsNone(manager.artifact)
+
+    def test_artifact_without_search_path(self):
+        ''' Check the template search path is optional with an artifact.
+        '''
+        manager = TemplateManager(self.config_mode)
+        artifact_path = os.path.join(self.tmp, 'templates.ade')
+        TemplateArtifact.from_managers(manager).save(artifact_path)
+
+        config_mode = dict(
+            self.config_mode, template_artifact_path=artifact_path
+        )
+        del config_mode['template_search_path']
+        for search_path in (None, []):
+            if search_path is not None:
+                config_mode['template_search_path'] = search_path
+
+            loaded = TemplateManager(config_mode, lazy=True)
+            self.assertIsNotNone(loaded.artifact)
+            self.assertEqual(loaded.template_names, manager.template_names)
+
+        os.remove(artifact_path)
+        self.assertRaises(ConfigError, TemplateManager, config_mode)
+
+
+class Test_TemplateManagerOverlay(unittest.TestCase):
+
+    def setUp(self):
+        """
+        Setup test session, with an overlay over the test templates.
+        """
+        self.maxDiff = None
+        config = 'test/resources/config'
+        os.environ['ADE_CONFIG_PATH'] = config
+        config_manager = ConfigManager(config)
+        config_mode = copy.deepcopy(config_manager.get('test'))
+        self.tmp = tempfile.mkdtemp()
+        self.overlay_folder = os.path.join(self.tmp, 'overlay')
+        os.makedirs(os.path.join(self.overlay_folder, '@test_D@', 'test_D2'))
+        os.makedirs(os.path.join(self.overlay_folder, '@test_G@'))
+        with open(os.path.join(
+            self.overlay_folder, '@test_D@', 'test_D1.txt'
+        ), 'w') as file_data:
+            file_data.write('overlay')
+
+        config_mode['template_search_path'] = [
+            self.overlay_folder, config_mode['template_search_path']
+        ]
+        config_mode['project_mount_point'] = self.tmp
+        self.config_mode = config_mode
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_search_path_string(self):
+        ''' Check template paths can be given separated by os.pathsep.
+        '''
+        config_mode = dict(
+            self.config_mode,
+            template_search_path=os.pathsep.join(
+                self.config_mode['template_search_path']
+            )
+        )
+        manager = TemplateManager(config_mode)
+        self.assertTrue(manager.has_template('@test_G@'))
+
+    def test_merged_template(self):
+        ''' Check templates with the same name are merged.
+        '''
+        manager = TemplateManager(self.config_mode)
+        template = manager.get_template('@test_D@')
+        self.assertEqual(
+            [child['name'] for child in template['children']],
+            ['test_D1', 'test_D2', 'test_D1.txt']
+        )
+        self.assertEqual(template['children'][-1]['content'], 'overlay')
+        self.assertIs(manager.get_template('@test_D@'), template)
+
+    def test_merged_register(self):
+        ''' Check the register holds one template per name.
+        '''
+        manager = TemplateManager(self.config_mode)
+        names = [template['name'] for template in manager.register]
+        self.assertEqual(len(names), len(set(names)))
+        self.assertIn('@test_G@', names)
+        self.assertEqual(
+            manager.register[names.index('@test_D@')],
+            manager.get_template('@test_D@').to_dict()
+        )
+
+    def test_merged_resolve(self):
+        ''' Check resolved templates use the merged fragments.
+        '''
+        manager = TemplateManager(self.config_mode)
+        path = manager.find_path(
+            endswith='test_D2', template_name='@+test_A+@'
+        )
+        self.assertEqual(
+            path,
+            ['+test_A+', '+test_B+', 'test_C', 'test_C1', 'test_D', 'test_D2']
+        )
+
+    def test_refresh_overlay(self):
+        ''' Check changes in an overlay refresh the merged template.
+        '''
+        manager = TemplateManager(self.config_mode)
+        manager.resolve_template('@+test_A+@')
+        shutil.rmtree(os.path.join(self.overlay_folder, '@test_D@'))
+
+        self.assertEqual(manager.refresh(), ['@test_D@'])
+        self.assertEqual(
+            manager.find_path(endswith='test_D2', template_name='@+test_A+@'),
+            None
+        )
+        self.assertEqual(
+            manager.get_template('@test_D@')['children'][-1]['content'], ''
+        )
+
+    def test_lazy_register(self):
+        ''' Check a lazy manager registers only the reachable templates.
+        '''
+        manager = TemplateManager(self.config_mode, lazy=True)
+        self.assertEqual(manager.register, [])
+        schema = manager.resolve_template('@+test_A+@')
+        self.assertEqual(
+            schema,
+            TemplateManager(self.config_mode).resolve_template('@+test_A+@')
+        )
+
+        names = [template['name'] for template in manager.register]
+        self.assertIn('@test_D@', names)
+        self.assertNotIn('@test_G@', names)
+        self.assertNotIn('@+test_Z+@', names)
+        self.assertEqual(
+            manager.get_template('@test_D@')['children'][-1]['content'],
+            'overlay'
+        )
+
+    def test_lazy_missing_template(self):
+        ''' Check a lazy manager raises on unknown templates.
+        '''
+        manager = TemplateManager(self.config_mode, lazy=True)
+        self.assertFalse(manager.has_template('@test_missing@'))
+        self.assertRaises(KeyError, manager.get_template, '@test_missing@')
+        self.assertTrue(manager.has_template('@test_G@'))
+        self.assertEqual(
+            [template['name'] for template in manager.register], ['@test_G@']
+        )